@@ -0,0 +1,212 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains a benchmark of reading and writing SEG-Y files.
+
+Synthetic files are generated for each combination of the number of traces,
+the sample format and the endianness, and the main reading and writing
+operations are timed on them. Results are written as JSON, one record per
+operation and file, to be compared between versions:
+
+    python benchmarks/bench_segy_io.py --sizes 1000 100000 1000000 --output results.json
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import philoseismos
+from philoseismos import Segy
+from philoseismos.segy import Geometry, DataMatrix, instrumentation
+from philoseismos.segy.tools.constants import TH_columns
+
+
+# sample formats to benchmark: code -> name
+formats = {1: 'ibm', 5: 'float32', 3: 'int16', 2: 'int32'}
+
+# data types of the generated samples for each format
+sample_dtypes = {1: np.float32, 5: np.float32, 3: np.int16, 2: np.int32}
+
+# number of traces in one generated chunk
+chunk_size = 10000
+
+
+def generate_file(path, nt, ns, sample_format, endian):
+    """ Writes a synthetic SEG-Y file with nt traces of ns samples each.
+
+    Traces are grouped into shots of 100 channels, coordinates are scaled by 100.
+
+    """
+
+    sgy = Segy.empty(shape=(1, ns), sample_interval=1000)
+    sgy.BFH['Sample Format'] = sample_format
+    sgy.BFH['Traces / Ensemble'] = min(nt, 100)
+
+    dtype = sample_dtypes[sample_format]
+    rng = np.random.default_rng(0)
+
+    def chunks():
+        for start in range(0, nt, chunk_size):
+            traces = np.arange(start, min(start + chunk_size, nt))
+
+            headers = pd.DataFrame(0, index=traces, columns=TH_columns)
+            headers['TRACENO'] = traces + 1
+            headers['FFID'] = traces // 100 + 1
+            headers['CHAN'] = traces % 100 + 1
+            headers['CDP'] = traces // 100 + traces % 100
+            headers['COORDSC'] = -100
+            headers['SOU_X'] = (traces // 100) * 25.0
+            headers['REC_X'] = (traces // 100) * 25.0 + (traces % 100) * 5.0
+            headers['OFFSET'] = (traces % 100) * 5.0
+            headers['NUMSMP'] = ns
+            headers['DT'] = 1000
+
+            samples = rng.standard_normal((traces.size, ns)) * 1000
+
+            yield headers, samples.astype(dtype)
+
+    sgy.write_chunks(path, chunks(), endian=endian)
+
+
+def time_operation(function, repeat, stages=False):
+    """ Runs the function repeat times and returns the timings in seconds.
+
+    If stages is True, also returns the instrumentation summary of the last run.
+
+    """
+
+    timings = []
+    summary = None
+
+    for i in range(repeat):
+        recorder = instrumentation.Recorder() if stages and i == repeat - 1 else None
+
+        if recorder is not None:
+            recorder.start()
+
+        t0 = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - t0)
+
+        if recorder is not None:
+            recorder.stop()
+            summary = json.loads(recorder.summary().reset_index().to_json(orient='records'))
+
+    return timings, summary
+
+
+def benchmark_file(path, nt, endian, repeat, stages=False):
+    """ Times the operations on one file and returns a record for each of them. """
+
+    out_path = path + '.out.sgy'
+    loaded = Segy(path)
+
+    # only every tenth trace is replaced, in place
+    dm = DataMatrix()
+    dm.matrix = loaded.DM.matrix[::10].copy()
+    dm.dt = loaded.DM.dt
+
+    def replace():
+        dm.replace_in_file(path, indices=slice(0, nt, 10))
+
+    operations = {
+        'Segy.load_file': lambda: Segy(path),
+        'Segy.save_file': lambda: loaded.save_file(out_path, endian=endian),
+        'Geometry.load_from_file': lambda: Geometry(path),
+        'DataMatrix.replace_in_file': replace,
+        'extract_by_fixed_headers': lambda: loaded.extract_by_fixed_headers({'CHAN': (1, 10)}),
+    }
+
+    records = []
+
+    for name, function in operations.items():
+        timings, summary = time_operation(function, repeat, stages)
+
+        records.append({
+            'operation': name,
+            'min': min(timings),
+            'median': statistics.median(timings),
+            'timings': timings,
+            'traces_per_second': nt / min(timings),
+            'stages': summary,
+        })
+
+    if os.path.exists(out_path):
+        os.remove(out_path)
+
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark reading and writing of SEG-Y files.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000],
+                        help='numbers of traces in the generated files')
+    parser.add_argument('--samples', type=int, default=500, help='number of samples in each trace')
+    parser.add_argument('--formats', type=int, nargs='+', default=list(formats), choices=list(formats),
+                        help='sample format codes to benchmark')
+    parser.add_argument('--endians', nargs='+', default=['>', '<'], choices=['>', '<'],
+                        help='byte orders to benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='number of runs of each operation')
+    parser.add_argument('--stages', action='store_true', help='record the stages of the last run of each operation')
+    parser.add_argument('--directory', help='directory for the generated files (a temporary one by default)')
+    parser.add_argument('--output', help='file to write the results into (standard output by default)')
+    args = parser.parse_args(argv)
+
+    directory = args.directory or tempfile.mkdtemp(prefix='philoseismos-bench-')
+    os.makedirs(directory, exist_ok=True)
+
+    results = {
+        'environment': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'philoseismos': getattr(philoseismos, '__version__', None),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'parameters': vars(args),
+        'results': [],
+    }
+
+    try:
+        for nt in args.sizes:
+            for sample_format in args.formats:
+                for endian in args.endians:
+                    name = f'{nt}_{formats[sample_format]}_{"big" if endian == ">" else "little"}.sgy'
+                    path = os.path.join(directory, name)
+
+                    generate_file(path, nt, args.samples, sample_format, endian)
+
+                    for record in benchmark_file(path, nt, endian, args.repeat, args.stages):
+                        record.update(traces=nt, samples=args.samples, format=formats[sample_format],
+                                      endian=endian, file_size=os.path.getsize(path))
+                        results['results'].append(record)
+
+                        print(f'{name:>32} {record["operation"]:>28} {record["min"]:10.4f} s', file=sys.stderr)
+
+                    os.remove(path)
+    finally:
+        if not args.directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    text = json.dumps(results, indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,13 +5,27 @@ e-mail: dubrovin.io@icloud.com """
 
 # other modules
 from philoseismos.segy.tools import general_functions as gfunc
+from philoseismos.segy.tools import instrumentation
 
 # constants
 from philoseismos.segy.tools.constants import BFH_columns
 
+# file parameters
+from philoseismos.segy.tools.file_info import SegyFileInfo
+
 # SEG-Y components
 from philoseismos.segy.components import TextualFileHeader
 from philoseismos.segy.components import BinaryFileHeader
 from philoseismos.segy.components import DataMatrix
 from philoseismos.segy.components import Geometry
+from philoseismos.segy.components import HeaderIndex
+from philoseismos.segy.components import SegyWriter
 from philoseismos.segy.components import Segy
+from philoseismos.segy.components import SegyDataset
+from philoseismos.segy.components import TraceArchive
+
+# scanning many files
+from philoseismos.segy.tools.scan import scan_headers
+
+# re-sorting files
+from philoseismos.segy.tools.resort import resort
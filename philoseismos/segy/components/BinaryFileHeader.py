@@ -8,6 +8,7 @@ e-mail: dubrovin.io@icloud.com """
 
 from philoseismos.segy.tools.constants import BFH_columns, BFH_format_string
 from philoseismos.segy import gfunc
+from philoseismos.segy.tools.file_info import SegyFileInfo
 
 import pandas as pd
 import numpy as np
@@ -48,11 +49,7 @@ class BinaryFileHeader:
 
         """
 
-        with open(file, 'br') as f:
-            f.seek(3200)
-            bytes = f.read(400)
-
-        self.load_from_bytes(bytes)
+        self.load_from_bytes(SegyFileInfo.from_file(file).bfh_bytes)
 
     def load_from_bytes(self, bytes):
         """ Loads and unpacks the bytes given into self.
@@ -93,6 +90,8 @@ class BinaryFileHeader:
             f.seek(3200)
             f.write(self._bytes)
 
+        SegyFileInfo.invalidate(file)
+
         # --- Text files --- #
 
     def export_to_csv(self, file):
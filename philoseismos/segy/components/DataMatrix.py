@@ -6,17 +6,15 @@ of a numpy 2D array.
 @author: Ivan Dubrovin
 e-mail: dubrovin.io@icloud.com """
 
-import os.path
-import struct
-
 import numpy as np
 import scipy.fftpack as fft
 from tqdm import tqdm
 
 from philoseismos.segy import gfunc
 from philoseismos.segy.tools import ibm
-from philoseismos.segy.tools.constants import data_type_map1, unpack_pbar_params
-from philoseismos.segy.tools.constants import sample_format_codes as sfc
+from philoseismos.segy.tools.file_info import SegyFileInfo
+from philoseismos.segy.tools import instrumentation
+from philoseismos.segy.tools.constants import unpack_pbar_params
 
 
 class DataMatrix:
@@ -27,7 +25,7 @@ class DataMatrix:
 
      """
 
-    def __init__(self, file=None, progress=False):
+    def __init__(self, file=None, progress=False, mmap=False, workers=None, dtype=None):
         """ Create a new Data Matrix. """
 
         self.matrix = None
@@ -38,7 +36,7 @@ class DataMatrix:
         self._parent = None
 
         if file:
-            self.load_from_file(file, progress=progress)
+            self.load_from_file(file, progress=progress, mmap=mmap, workers=workers, dtype=dtype)
 
     def crop_traces(self, end_time):
         """ Set new length for traces.
@@ -140,96 +138,123 @@ class DataMatrix:
 
     # ----- Loading, writing ----- #
 
-    def load_from_file(self, file, progress=False):
+    def load_from_file(self, file, progress=False, mmap=False, workers=None, dtype=None):
         """ Returns a DataMatrix object extracted from the file.
 
         Args:
             file: A path to the file.
             progress: Toggle the progress bar (disabled by default).
+            mmap: Map the traces from the file instead of reading them (disabled by default).
+            workers: Number of threads that read and unpack blocks of traces in parallel.
+            dtype: Data type of the matrix. Defaults to the smallest type that holds the
+                samples exactly (see data_type_map1), float32 for IBM values
+                (use float64 for IBM values beyond the range of float32).
+
+        Notes:
+            With mmap enabled, the matrix is a read-only view into the memory mapped file,
+            so traces are only read from disk when they are accessed. Use np.array(dm.matrix)
+            to get an in-memory copy. IBM values can not be viewed directly and are
+            always unpacked into memory. Traces are not mapped either if the requested
+            dtype is different from the data type of the samples in the file.
 
         """
 
-        # endian, format letter, trace length, sample size, number of traces, numpy data type
-        endian, fl, tl, ss, nt, dtype, si = self._get_parameters_from_file(file)
+        # endian, format letter, trace length, sample size, number of traces, numpy data type, sample interval
+        parameters = self._get_parameters_from_file(file)
+        self._load_with_parameters(file, *parameters, progress=progress, mmap=mmap, workers=workers,
+                                   matrix_dtype=dtype)
 
-        self.matrix = np.empty(shape=(nt, tl), dtype=dtype)
-
-        with open(file, 'br') as f:
-            f.seek(3600)  # skip Textual and Binary file headers
-
-            if not fl:  # for IBM values format letter is None
-                if progress:
-                    with tqdm(total=nt, **unpack_pbar_params) as pbar:
-                        for i in range(nt):
-                            f.seek(f.tell() + 240)  # skip trace header
-                            raw_trace = f.read(ss * tl)  # the size of the trace is (trace length) * (sample size)
-
-                            values = ibm.unpack_ibm32_series(endian, bytearray(raw_trace))
-                            self.matrix[i] = values
-                            pbar.update(1)
-                else:
-                    for i in range(nt):
-                        f.seek(f.tell() + 240)  # skip trace header
-                        raw_trace = f.read(ss * tl)  # the size of the trace is (trace length) * (sample size)
-
-                        values = ibm.unpack_ibm32_series(endian, bytearray(raw_trace))
-                        self.matrix[i] = values
-
-            else:
-                format_string = endian + fl * tl
-
-                if progress:
-                    with tqdm(total=nt, **unpack_pbar_params) as pbar:
-                        for i in range(nt):
-                            f.seek(f.tell() + 240)  # skip trace header
-                            raw_trace = f.read(ss * tl)  # the size of the trace is (trace length) * (sample size)
-
-                            values = struct.unpack(format_string, raw_trace)
-                            self.matrix[i] = values
-                            pbar.update(1)
-                else:
-                    for i in range(nt):
-                        f.seek(f.tell() + 240)  # skip trace header
-                        raw_trace = f.read(ss * tl)  # the size of the trace is (trace length) * (sample size)
-
-                        values = struct.unpack(format_string, raw_trace)
-                        self.matrix[i] = values
+    def _load_with_parameters(self, file, endian, fl, tl, ss, nt, dtype, si, progress=False, mmap=False,
+                              workers=None, matrix_dtype=None):
+        """ Loads the traces from the file, given the parameters from _get_parameters_from_file.
+
+        Samples are converted to matrix_dtype, if it is given and differs from dtype.
+
+        """
 
         # generate time axis
         self.dt = si / 1e3  # convert to ms
         self.t = np.arange(0, tl * self.dt, self.dt)
 
-    def replace_in_file(self, file):
+        trace_dtype = gfunc._trace_dtype(endian, fl, dtype, tl)
+
+        matrix_dtype = np.dtype(matrix_dtype or dtype)
+
+        if mmap and fl and matrix_dtype == dtype:  # for IBM values format letter is None
+            traces = np.memmap(file, dtype=trace_dtype, mode='r', offset=3600, shape=(nt,))
+            self.matrix = traces['data']
+            return
+
+        self.matrix = np.empty(shape=(nt, tl), dtype=matrix_dtype)
+
+        def unpack_block(start, traces):
+            with instrumentation.stage('sample decode', traces['data'].nbytes, traces.size):
+                self.matrix[start:start + traces.size] = self._unpack_samples(traces['data'], endian, fl)
+
+        with tqdm(total=nt, disable=not progress, **unpack_pbar_params) as pbar:
+            if workers and workers > 1:
+                for count in gfunc._map_trace_blocks(file, trace_dtype, nt, unpack_block, workers):
+                    pbar.update(count)
+                return
+
+            with open(file, 'br') as f:
+                f.seek(3600)  # skip Textual and Binary file headers
+
+                for start, traces in gfunc._read_trace_blocks(f, trace_dtype, nt):
+                    unpack_block(start, traces)
+                    pbar.update(traces.size)
+
+    def replace_in_file(self, file, indices=None, t0=None, t1=None):
         """ Replaces the traces in the file with self.
 
+        Only the given traces, and only the samples in the given time window,
+        are written. The file is memory mapped, so the rest of it is not touched.
+
         Parameters
         ----------
         file : str
             Path to the SEG-Y file to replace Data Matrix in.
+        indices : int, slice or array_like
+            Positions of the traces in the file to replace (starting from 0),
+            or a boolean mask over all of them.
+            Defaults to all the traces.
+        t0 : float
+            Start of the time window in ms (inclusive). Defaults to the start of the traces.
+        t1 : float
+            End of the time window in ms (exclusive). Defaults to the end of the traces.
+
+        Notes
+        -----
+        The matrix has to either contain exactly the traces and the samples to write,
+        or have the full shape of the Data Matrix in the file, in which case the traces
+        and the samples to write are taken from it.
+
         """
 
         endian, fl, tl, ss, nt, dtype, si = self._get_parameters_from_file(file)
 
-        if self.matrix.shape != (nt, tl):
+        indices = np.arange(nt) if indices is None else gfunc._normalize_trace_indices(indices, nt)
+        s0, s1 = gfunc._sample_window(t0, t1, si, tl)
+
+        if self.matrix.shape == (indices.size, s1 - s0):
+            values = self.matrix
+        elif self.matrix.shape == (nt, tl):
+            values = self.matrix[indices, s0:s1]
+        else:
             raise ValueError('Matrix shape does not fit the file!')
 
-        if self.matrix.dtype != dtype:
-            raise ValueError('Matrix data type does not match the file!')
+        # IBM values are always packed from floats, other formats are assigned with a safe cast
+        if fl is None:
+            if self.matrix.dtype.kind != 'f':
+                raise ValueError('Matrix has to hold floats to be written as IBM values!')
+        elif not np.can_cast(self.matrix.dtype, dtype):
+            raise ValueError('Matrix data type can not be safely cast to the data type of the file!')
 
-        with open(file, 'br+') as f:
-            f.seek(3600)
+        trace_dtype = gfunc._trace_dtype(endian, fl, dtype, tl)
+        traces = np.memmap(file, dtype=trace_dtype, mode='r+', offset=3600, shape=(nt,))
 
-            if not fl:
-                for i in range(nt):
-                    f.seek(f.tell() + 240)
-                    raw_trace = ibm.pack_ibm32_series(endian, self.matrix[i])
-                    f.write(raw_trace)
-            else:
-                format_string = endian + fl * tl
-                for i in range(nt):
-                    f.seek(f.tell() + 240)
-                    raw_trace = struct.pack(format_string, *self.matrix[i])
-                    f.write(raw_trace)
+        traces['data'][indices, s0:s1] = self._pack_samples(values, endian, fl)
+        traces.flush()
 
     # ----- Dunder methods ----- #
 
@@ -242,9 +267,8 @@ class DataMatrix:
     def _get_parameters_from_file(file):
         """ Returns all the parameters needed to load the traces.
 
-        All these values can be extracted one by one using functions
-        defined in philoseismos.segy.gfunc, this method is an alternative
-        which only opens the file once, not once per value.
+        The values are taken from the cached SegyFileInfo of the file,
+        so the headers of the file are only parsed once.
 
         Parameters
         ----------
@@ -265,31 +289,52 @@ class DataMatrix:
             Number of traces in the file.
         dtype : type
             Data type to create a matrix with.
+        si : int
+            Sample interval in microseconds.
+
+        """
+
+        return SegyFileInfo.from_file(file).parameters
+
+    @staticmethod
+    def _unpack_samples(data, endian, fl):
+        """ Returns the values of the raw samples read from the file.
+
+        IBM values (format letter is None) are unpacked from the 4 byte words,
+        other formats are already described by their numpy data type.
 
         """
 
-        with open(file, 'br') as f:
-            f.seek(3216)
-            si_bytes = f.read(2)
-            f.seek(3220)
-            tl_bytes = f.read(2)
-            f.seek(3224)
-            sf_bytes = f.read(2)
-            f.seek(3512)
-            nt_bytes = f.read(8)
+        if not fl:
+            return ibm.unpack_ibm32_array(endian, data)
+
+        return data
+
+    @staticmethod
+    def _pack_samples(values, endian, fl):
+        """ Returns the values prepared to be written into the file.
+
+        IBM values (format letter is None) are packed into 4 byte words,
+        other formats are converted when assigned to the trace array.
+
+        Raises ValueError if the values do not fit into an integer sample format,
+        since the conversion would silently wrap them around.
+
+        """
 
-        endian = gfunc._detect_endianness_from_sample_format_bytes(sf_bytes)
+        if not fl:
+            return ibm.pack_ibm32_array(endian, values)
 
-        si = struct.unpack(endian + 'h', si_bytes)[0]
-        tl = struct.unpack(endian + 'h', tl_bytes)[0]
-        sf = struct.unpack(endian + 'h', sf_bytes)[0]
-        nt = struct.unpack(endian + 'Q', nt_bytes)[0]
+        sample_dtype = np.dtype(fl)
+        values = np.asarray(values)
 
-        sample_size, format_letter, _ = sfc[sf]
-        dtype = data_type_map1[sf]
+        if sample_dtype.kind in 'iu' and values.size and not np.can_cast(values.dtype, sample_dtype):
+            if values.dtype.kind == 'f' and not np.all(np.isfinite(values)):
+                raise ValueError('Samples have to be finite to be written in an integer sample format!')
 
-        if nt == 0:
-            data_size = os.path.getsize(file) - 3600
-            nt = int(data_size / (sample_size * tl + 240))
+            limits = np.iinfo(sample_dtype)
+            if values.min() < limits.min or values.max() > limits.max:
+                raise ValueError(f'Samples do not fit into the {limits.bits // 8}-byte integer sample format '
+                                 f'[{limits.min}, {limits.max}]!')
 
-        return endian, format_letter, tl, sample_size, nt, dtype, si
+        return values
@@ -7,11 +7,10 @@ of all the trace headers in a SEG-Y file.
 e-mail: dubrovin.io@icloud.com """
 
 from philoseismos.segy import gfunc
-from philoseismos.segy.tools.constants import sample_format_codes as sfc
-from philoseismos.segy.tools.constants import TH_columns, TH_format_string
+from philoseismos.segy.tools.constants import TH_columns, TH_coordinate_columns
+from philoseismos.segy.tools.file_info import SegyFileInfo
+from philoseismos.segy.tools import instrumentation
 
-import struct
-import os
 import pandas as pd
 import numpy as np
 
@@ -19,8 +18,13 @@ import numpy as np
 class Geometry:
     """ This object represents geometry: a collection of all the Trace Headers. """
 
-    def __init__(self, file=None):
-        """ """
+    def __init__(self, file=None, columns=None):
+        """ Create a new Geometry.
+
+        If file is specified, loads the Trace Headers from that file
+        (only the given columns, if specified).
+
+        """
 
         self.table = None
         self.headers = ['TRACENO', 'FFID', 'CHAN',
@@ -28,60 +32,85 @@ class Geometry:
                         'CDP_X']
 
         if file:
-            self.load_from_file(file)
+            self.load_from_file(file, columns=columns)
 
     # ----- Loading, writing ----- #
 
-    def load_from_file(self, file):
+    def load_from_file(self, file, columns=None):
         """ Returns a Geometry object extracted from the file.
 
+        Each header is stored in the table with its own data type (int16 for 2-byte
+        fields, int32 for 4-byte fields); coordinates become floats when they are scaled.
+
         Args:
             file: A path to the file.
+            columns: A list of names of the headers to load. Defaults to all of them.
+
+        Notes:
+            A Geometry loaded with only some of the columns writes zeros into
+            the other headers when it is saved into a new file. COORDSC is always
+            loaded together with the coordinates, since it is needed to write them back.
 
         """
 
         # endian, trace length, sample size, number of traces
         endian, tl, ss, nt = self._get_parameters_from_file(file)
+        self._load_with_parameters(file, endian, tl, ss, nt, columns=columns)
 
-        _table = np.empty(shape=(nt, len(TH_columns)), dtype=np.int32)
+    def _load_with_parameters(self, file, endian, tl, ss, nt, columns=None):
+        """ Loads the Trace Headers from the file, given the parameters from _get_parameters_from_file. """
 
-        with open(file, 'br') as f:
-            f.seek(3600)  # skip Textual and Binary file headers
+        # only the headers are decoded, the samples are skipped over as raw bytes
+        trace_dtype = np.dtype([('header', gfunc._trace_header_dtype(endian)), ('data', 'V%d' % (ss * tl))])
+        traces = np.memmap(file, dtype=trace_dtype, mode='r', offset=3600, shape=(nt,))
 
-            for i in range(nt):
-                raw_header = f.read(240)
+        self._load_from_headers(traces['header'], columns=columns)
 
-                values = struct.unpack(endian + TH_format_string, raw_header[:232])
-                _table[i] = values
+    def replace_in_file(self, file: str):
+        """ Replaces the geometry in the file with self.
 
-                f.seek(f.tell() + ss * tl)
+        Args:
+            file: A path to the file.
 
-        self.table = pd.DataFrame(_table, index=range(nt), columns=TH_columns)
-        self.table.fillna(0, inplace=True)
-        self._apply_coordinate_scalar_after_unpacking()
+        """
 
-    def replace_in_file(self, file: str):
-        """ Replaces the geometry in the file with self.
+        self.write_columns(file, [column for column in TH_columns if column in self.table])
+
+    def write_columns(self, file, columns):
+        """ Writes only the given columns of self into the Trace Headers of the file.
+
+        Only the bytes of the given fields are changed: the file is memory mapped
+        and each column is written into its fields of all the Trace Headers at once.
 
         Args:
             file: A path to the file.
+            columns: A list of names of the headers to write.
+
+        Raises:
+            KeyError: If a column is not a Trace Header or is not in the table.
+            ValueError: If coordinates are written, but the table has no COORDSC to scale them with.
 
         """
 
+        for column in columns:
+            if column not in TH_columns:
+                raise KeyError(f'{column!r} is not a Trace Header!')
+            if column not in self.table:
+                raise KeyError(f'{column!r} is not in the Geometry table!')
+
+        if 'COORDSC' not in self.table and any(column in TH_coordinate_columns for column in columns):
+            raise ValueError('Coordinates can not be written without COORDSC in the Geometry table!')
+
         endian, tl, ss, nt = self._get_parameters_from_file(file)
 
-        self._apply_coordinates_scalar_before_packing()
+        if len(self.table) != nt:
+            raise ValueError('Geometry does not fit the number of traces in the file!')
 
-        with open(file, 'br+') as f:
-            f.seek(3600)
-            for i in range(nt):
-                raw_header = bytearray(240)
-                raw_header[:232] = struct.pack(endian + TH_format_string, *self.table.loc[i, :].values)
-                f.write(raw_header)
-                f.seek(f.tell() + ss * tl)
+        trace_dtype = np.dtype([('header', gfunc._trace_header_dtype(endian)), ('data', 'V%d' % (ss * tl))])
+        traces = np.memmap(file, dtype=trace_dtype, mode='r+', offset=3600, shape=(nt,))
 
-        # to restore the table to its true form, we remove the effect of applying scalars
-        self._apply_coordinate_scalar_after_unpacking()
+        self._pack_headers(traces['header'], columns=columns)
+        traces.flush()
 
     # ----- Properties ----- #
     @property
@@ -105,104 +134,120 @@ class Geometry:
 
         """ Returns all the parameters needed to load the geometry.
 
-        All these values can be extracted one by one using functions
-        defined in philoseismos.segy.gfunc, this method is an alternative
-        which only opens the file once, not once per value.
+        The values are taken from the cached SegyFileInfo of the file,
+        so the headers of the file are only parsed once.
 
         Returns a tuple:
         (endian, trace length in samples, sample size, number of traces).
 
         """
 
-        with open(file, 'br') as f:
-            f.seek(3220)
-            tl_bytes = f.read(2)
-            f.seek(3224)
-            sf_bytes = f.read(2)
-            f.seek(3512)
-            nt_bytes = f.read(8)
+        info = SegyFileInfo.from_file(file)
+
+        return info.endian, info.trace_length, info.sample_size, info.number_of_traces
+
+    # ----- Internal methods ----- #
+
+    def _load_from_headers(self, headers, columns=None):
+        """ Unpacks the Trace Headers into self.
+
+        Parameters
+        ----------
+        headers : numpy.ndarray
+            Array of Trace Headers, with the structured data type
+            given by gfunc._trace_header_dtype().
+        columns : list
+            Names of the headers to unpack. Defaults to all of them.
+            COORDSC is added if any of them are coordinates.
+
+        """
+
+        columns = TH_columns if columns is None else list(columns)
 
-        endian = gfunc._detect_endianness_from_sample_format_bytes(sf_bytes)
+        # the coordinate scalar is needed to unpack the coordinates, and to pack them back
+        if 'COORDSC' not in columns and any(column in TH_coordinate_columns for column in columns):
+            columns = columns + ['COORDSC']
 
-        tl = struct.unpack(endian + 'h', tl_bytes)[0]
-        sf = struct.unpack(endian + 'h', sf_bytes)[0]
-        nt = struct.unpack(endian + 'Q', nt_bytes)[0]
+        with instrumentation.stage('geometry decode', headers.size * 240, headers.size):
+            # each header is converted to its own data type with the native byte order
+            self.table = pd.DataFrame({column: headers[column].astype(headers.dtype[column].newbyteorder('='))
+                                       for column in columns}, index=range(headers.size))
 
-        sample_size, _, _ = sfc[sf]
+            self._apply_coordinate_scalar_after_unpacking()
 
-        if nt == 0:
-            data_size = os.path.getsize(file) - 3600
-            nt = int(data_size / (sample_size * tl + 240))
+    def _pack_headers(self, headers, start=0, columns=TH_columns):
+        """ Packs a range of rows of the table into an array of Trace Headers.
 
-        return endian, tl, sample_size, nt
+        The coordinate scalar is applied to the coordinates on the way into the
+        headers, so the table itself is not changed.
 
-    # ----- Internal methods ----- #
+        Parameters
+        ----------
+        headers : numpy.ndarray
+            Array of Trace Headers to fill, with the structured data type
+            given by gfunc._trace_header_dtype().
+        start : int
+            Index of the row in the table that goes into the first header.
+        columns : list
+            Names of the headers to fill. Defaults to all of them.
+
+        Raises
+        ------
+        ValueError
+            If the values of a header (scaled, for coordinates) are not finite or do not fit into its field.
+
+        """
+
+        stop = start + headers.size
+
+        # headers that are not in the table are left as they are
+        columns = [column for column in columns if column in self.table]
+
+        if any(column in TH_coordinate_columns for column in columns):
+            # when unpacking, negative scalar is used as a divisor, and positive as a multiplier;
+            # without COORDSC in the table, it is written as zero, so the coordinates are not scaled
+            scalar = self.table['COORDSC'].values[start:stop] if 'COORDSC' in self.table else 1
+            multiplier = np.where(scalar < 0, -scalar, 1)
+            divisor = np.where(scalar > 0, scalar, 1)
+
+        for column in columns:
+            values = self.table[column].values[start:stop]
+
+            if column in TH_coordinate_columns:
+                # since these headers have to be integers, they are rounded
+                values = np.rint(np.asarray(values, dtype=np.float64) * multiplier / divisor)
+
+            # values that do not fit into the field would be silently wrapped around
+            if values.dtype.kind == 'f' and not np.all(np.isfinite(values)):
+                raise ValueError(f'Values of {column} have to be finite!')
+
+            limits = np.iinfo(headers.dtype[column])
+            if values.size and (values.min() < limits.min or values.max() > limits.max):
+                raise ValueError(f'Values of {column} do not fit into its {limits.bits // 8}-byte field '
+                                 f'[{limits.min}, {limits.max}]!')
+
+            headers[column] = values
 
     def _apply_coordinate_scalar_after_unpacking(self):
         """ Applies the coordinate scalar to all relevant headers after unpacking. """
 
-        # zero should be treated as one
-        self.table['COORDSC'].loc[self.table['COORDSC'] == 0] = 1
-        absolute_scalar_value = abs(self.table.COORDSC)
-
-        # if negative, to be used as a divisor
-        negative_scalar_indices = self.table.COORDSC < 0
-
-        self.table.loc[negative_scalar_indices, 'SOU_X'] /= absolute_scalar_value
-        self.table.loc[negative_scalar_indices, 'SOU_Y'] /= absolute_scalar_value
-        self.table.loc[negative_scalar_indices, 'REC_X'] /= absolute_scalar_value
-        self.table.loc[negative_scalar_indices, 'REC_Y'] /= absolute_scalar_value
-        self.table.loc[negative_scalar_indices, 'CDP_X'] /= absolute_scalar_value
-        self.table.loc[negative_scalar_indices, 'CDP_Y'] /= absolute_scalar_value
-        self.table.loc[negative_scalar_indices, 'OFFSET'] /= absolute_scalar_value
-
-        # if positive, to be used as a multiplier
-        positive_scalar_indices = self.table.COORDSC > 0
-
-        self.table.loc[positive_scalar_indices, 'SOU_X'] *= absolute_scalar_value
-        self.table.loc[positive_scalar_indices, 'SOU_Y'] *= absolute_scalar_value
-        self.table.loc[positive_scalar_indices, 'REC_X'] *= absolute_scalar_value
-        self.table.loc[positive_scalar_indices, 'REC_Y'] *= absolute_scalar_value
-        self.table.loc[positive_scalar_indices, 'CDP_X'] *= absolute_scalar_value
-        self.table.loc[positive_scalar_indices, 'CDP_Y'] *= absolute_scalar_value
-        self.table.loc[positive_scalar_indices, 'OFFSET'] *= absolute_scalar_value
-
-    def _apply_coordinates_scalar_before_packing(self):
-        """ Applies the coordinate scalar to all relevant headers before packing. """
+        if 'COORDSC' not in self.table:
+            return
 
         # zero should be treated as one
-        # self.table['COORDSC'].loc[self.table['COORDSC'] == 0] = 1
-        absolute_scalar_value = abs(self.table.COORDSC)
-
-        # when unpacking, if negative, to be used as a divisor,
-        # so here we multiply
-        negative_scalar_indices = self.table.COORDSC < 0
-
-        self.table.loc[negative_scalar_indices, 'SOU_X'] *= absolute_scalar_value
-        self.table.loc[negative_scalar_indices, 'SOU_Y'] *= absolute_scalar_value
-        self.table.loc[negative_scalar_indices, 'REC_X'] *= absolute_scalar_value
-        self.table.loc[negative_scalar_indices, 'REC_Y'] *= absolute_scalar_value
-        self.table.loc[negative_scalar_indices, 'CDP_X'] *= absolute_scalar_value
-        self.table.loc[negative_scalar_indices, 'CDP_Y'] *= absolute_scalar_value
-        self.table.loc[negative_scalar_indices, 'OFFSET'] *= absolute_scalar_value
-
-        # when unpacking, if positive, to be used as a multiplier,
-        # so here we divide
-        positive_scalar_indices = self.table.COORDSC > 0
-
-        self.table.loc[positive_scalar_indices, 'SOU_X'] /= absolute_scalar_value
-        self.table.loc[positive_scalar_indices, 'SOU_Y'] /= absolute_scalar_value
-        self.table.loc[positive_scalar_indices, 'REC_X'] /= absolute_scalar_value
-        self.table.loc[positive_scalar_indices, 'REC_Y'] /= absolute_scalar_value
-        self.table.loc[positive_scalar_indices, 'CDP_X'] /= absolute_scalar_value
-        self.table.loc[positive_scalar_indices, 'CDP_Y'] /= absolute_scalar_value
-        self.table.loc[positive_scalar_indices, 'OFFSET'] /= absolute_scalar_value
-
-        # since these headers have to be integers, we transform them
-        self.table.loc[:, 'SOU_X'] = np.int64(self.table['SOU_X'].values)
-        self.table.loc[:, 'SOU_Y'] = np.int64(self.table['SOU_Y'].values)
-        self.table.loc[:, 'REC_X'] = np.int64(self.table['REC_X'].values)
-        self.table.loc[:, 'REC_Y'] = np.int64(self.table['REC_Y'].values)
-        self.table.loc[:, 'CDP_X'] = np.int64(self.table['CDP_X'].values)
-        self.table.loc[:, 'CDP_Y'] = np.int64(self.table['CDP_Y'].values)
-        self.table.loc[:, 'OFFSET'] = np.int64(self.table['OFFSET'].values)
+        scalar = self.table['COORDSC'].values
+        if np.any(scalar == 0):
+            scalar = np.where(scalar == 0, 1, scalar)
+            self.table['COORDSC'] = scalar
+
+        if np.all(scalar == 1):
+            return
+
+        # if negative, to be used as a divisor, if positive, as a multiplier
+        multiplier = np.where(scalar > 0, scalar, 1)
+        divisor = np.where(scalar < 0, -scalar, 1)
+
+        with instrumentation.stage('scalar application', n_traces=scalar.size):
+            for column in TH_coordinate_columns:
+                if column in self.table:
+                    self.table[column] = self.table[column].values * multiplier / divisor
@@ -0,0 +1,176 @@
+""" philoseismos: with passion for the seismic method.
+
+This file defines the HeaderIndex object that maps key trace headers
+of a SEG-Y file to the positions of the traces in that file.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+from philoseismos.segy import gfunc
+from philoseismos.segy.components.Geometry import Geometry
+
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+
+
+class HeaderIndex:
+    """ Index of the key Trace Headers of a SEG-Y file.
+
+    The index is built once from the Trace Headers and is stored in a sidecar
+    file next to the SEG-Y file, or in a separate sidecar directory. It is rebuilt
+    automatically when the size or the modification time of the SEG-Y file changes.
+    If the sidecar can not be written (e.g. the directory is read-only), the index
+    is only kept in memory.
+
+    """
+
+    # headers that are stored in the index
+    keys = ['FFID', 'CHAN', 'CDP', 'In-line No.', 'Cross-line No.', 'OFFSET']
+
+    def __init__(self, file=None, rebuild=False, sidecar_dir=None):
+        """ Create an empty Header Index.
+
+        If file is specified, loads the index of that file from its sidecar,
+        or builds it if the sidecar is missing or outdated. Sidecar_dir is the
+        directory of the sidecar; defaults to the directory of the file.
+
+        """
+
+        self.file = None
+        self.table = None
+        self.sidecar_dir = sidecar_dir
+
+        self.file_size = None
+        self.mtime = None
+
+        if file:
+            self.load(file, rebuild=rebuild)
+
+    # ----- Loading, writing ----- #
+
+    def load(self, file, rebuild=False):
+        """ Loads the index of the file from its sidecar, building it if needed.
+
+        Parameters
+        ----------
+        file : str
+            Path to the SEG-Y file.
+        rebuild : bool
+            Build the index even if a valid sidecar exists.
+
+        """
+
+        self.file = file
+        sidecar = self.sidecar_path(file, self.sidecar_dir)
+
+        if not rebuild and os.path.exists(sidecar):
+            with np.load(sidecar) as stored:
+                self.file_size = int(stored['file_size'])
+                self.mtime = int(stored['mtime'])
+                self.table = pd.DataFrame({column: stored[column] for column in self.keys + ['TRACE', 'BYTE']})
+
+            if self.is_valid:
+                return
+
+        self.build(file)
+
+        try:
+            self.save()
+        except OSError:
+            # the sidecar is optional, the index is still usable from memory
+            pass
+
+    def build(self, file):
+        """ Builds the index from the Trace Headers of the file.
+
+        Parameters
+        ----------
+        file : str
+            Path to the SEG-Y file.
+
+        """
+
+        stat = os.stat(file)
+        self.file = file
+        self.file_size = stat.st_size
+        self.mtime = stat.st_mtime_ns
+
+        endian, tl, ss, nt = Geometry._get_parameters_from_file(file)
+
+        # only the key headers are decoded
+        g = Geometry()
+        g._load_with_parameters(file, endian, tl, ss, nt, columns=self.keys)
+
+        self.table = g.table.loc[:, self.keys].copy()
+        self.table['TRACE'] = np.arange(nt)
+        self.table['BYTE'] = 3600 + np.arange(nt, dtype=np.int64) * (240 + ss * tl)
+
+    def save(self):
+        """ Saves the index into the sidecar file of the SEG-Y file. """
+
+        columns = {column: self.table[column].values for column in self.table.columns}
+
+        with open(self.sidecar_path(self.file, self.sidecar_dir), 'bw') as f:
+            np.savez(f, file_size=self.file_size, mtime=self.mtime, **columns)
+
+    # ----- Querying ----- #
+
+    def select(self, fixed_headers):
+        """ Returns the positions of the traces with given fixed headers.
+
+        Parameters
+        ----------
+        fixed_headers : dict
+            Dictionary of format {header name 1: condition 1, ...}, with conditions
+            as in Segy.extract_by_fixed_headers. Header names have to be among HeaderIndex.keys.
+
+        Returns
+        -------
+        traces : numpy.ndarray
+            Positions of the selected traces in the file (starting from 0).
+
+        """
+
+        mask = gfunc._headers_mask(self.table, fixed_headers)
+
+        return self.table['TRACE'].values[mask]
+
+    # ----- Properties ----- #
+
+    @property
+    def is_valid(self):
+        """ True if the SEG-Y file has not changed since the index was built. """
+
+        try:
+            stat = os.stat(self.file)
+        except OSError:
+            return False
+
+        return stat.st_size == self.file_size and stat.st_mtime_ns == self.mtime
+
+    # ----- Dunder methods ----- #
+
+    def __repr__(self):
+        return str(self.table)
+
+    # ----- Static methods ----- #
+
+    @staticmethod
+    def sidecar_path(file, sidecar_dir=None):
+        """ Returns the path to the sidecar file that stores the index of the file.
+
+        The sidecar is next to the file, unless a sidecar directory is given. In a sidecar
+        directory, the name includes a hash of the absolute path of the file, so that
+        files with the same name from different directories do not share a sidecar.
+
+        """
+
+        if sidecar_dir is None:
+            return str(file) + '.idx.npz'
+
+        path = os.path.abspath(file)
+        digest = hashlib.sha1(path.encode()).hexdigest()[:16]
+
+        return os.path.join(sidecar_dir, f'{os.path.basename(path)}.{digest}.idx.npz')
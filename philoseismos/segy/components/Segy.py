@@ -7,13 +7,16 @@ the Segy object.
 e-mail: dubrovin.io@icloud.com """
 
 from philoseismos.segy.components import TextualFileHeader, BinaryFileHeader
-from philoseismos.segy.components import DataMatrix, Geometry
+from philoseismos.segy.components import DataMatrix, Geometry, HeaderIndex, SegyWriter
 from philoseismos.segy.tools.constants import sample_format_codes as sfc
-from philoseismos.segy.tools import ibm
-from philoseismos.segy.tools.constants import TH_format_string, TH_columns, pack_pbar_params
+from philoseismos.segy.tools.constants import TH_columns, pack_pbar_params, unpack_pbar_params
+from philoseismos.segy.tools.constants import data_type_map1
 from philoseismos.segy.tools import general_functions as gfunc
+from philoseismos.segy.tools.file_info import SegyFileInfo
+from philoseismos.segy.tools import instrumentation
 
-import struct
+import os
+import threading
 import numpy as np
 import pandas as pd
 from tqdm import tqdm
@@ -26,117 +29,553 @@ class Segy:
 
     """
 
-    def __init__(self, file=None, progress=False):
+    def __init__(self, file=None, progress=False, mmap=False, lazy=False, workers=None, columns=None, dtype=None):
         """ Creates an empty Segy object.
 
-        If file is specified, loads the contents from that file.
+        If file is specified, loads the contents from that file. If mmap is True,
+        the traces are memory mapped instead of being read (see DataMatrix.load_from_file).
+        If lazy is True, the Data Matrix and the Geometry are only read from the file
+        when they are accessed for the first time. Workers is the number of threads
+        that read and unpack blocks of traces in parallel. Columns is a list of the
+        Trace Headers to load into the Geometry (all of them by default). Dtype is the
+        data type of the Data Matrix (see DataMatrix.load_from_file).
 
         """
 
         self.file = file
 
+        # parameters derived from the Binary File Header of the file
+        self._parameters = None
+
+        # components that are still to be loaded from the file in lazy mode
+        self._unloaded = set()
+        self._load_options = None
+        self._load_lock = threading.Lock()
+
         self.TFH = TextualFileHeader()
         self.BFH = BinaryFileHeader()
         self.DM = DataMatrix()
         self.G = Geometry()
 
-        # store reference to self in the components
-        self.DM._parent = self
-
         if file:
-            self.load_file(file, progress=progress)
+            self.load_file(file, progress=progress, mmap=mmap, lazy=lazy, workers=workers, columns=columns,
+                           dtype=dtype)
 
     # ----- Loading and writing ----- #
 
-    def load_file(self, file, progress=False):
-        """ Loads specified .sgy file into self. """
+    def load_file(self, file, progress=False, mmap=False, lazy=False, workers=None, columns=None, dtype=None):
+        """ Loads specified .sgy file into self.
+
+        The file is opened once and read in large blocks of traces. Both the Trace
+        Headers and the samples are extracted from the same blocks. The Textual and
+        Binary File Headers come from the cached SegyFileInfo of the file.
+
+        In lazy mode only the Textual and Binary File Headers are read. The parameters
+        derived from the Binary File Header are kept, and the Data Matrix and the Geometry
+        are read using them when they are accessed for the first time.
+
+        """
+
+        self.file = file
+
+        with instrumentation.stage('header parse', 3600):
+            info = SegyFileInfo.from_file(file)
+            self.TFH.load_from_bytes(info.tfh_bytes)
+            self.BFH.load_from_bytes(info.bfh_bytes)
+
+        parameters = self._parameters = info.parameters
+
+        if lazy:
+            self._load_options = progress, mmap, workers, columns, dtype
+            self._unloaded = {'DM', 'G'}
+            return
+
+        self._unloaded = set()
+        endian, fl, tl, ss, nt, file_dtype, si = parameters
+        trace_dtype = gfunc._trace_dtype(endian, fl, file_dtype, tl)
+        dtype = np.dtype(dtype or file_dtype)
+
+        self.DM.dt = si / 1e3  # convert to ms
+        self.DM.t = np.arange(0, tl * self.DM.dt, self.DM.dt)
+
+        with open(file, 'br') as f:
+            f.seek(3600)
+
+            if mmap and fl and dtype == file_dtype:  # for IBM values format letter is None
+                traces = np.memmap(f, dtype=trace_dtype, mode='r', offset=3600, shape=(nt,))
+                self.DM.matrix = traces['data']
+                self.G._load_from_headers(traces['header'], columns=columns)
+                return
+
+            self.DM.matrix = np.empty(shape=(nt, tl), dtype=dtype)
+            headers = np.empty(shape=nt, dtype=gfunc._trace_header_dtype(endian))
+
+            def unpack_block(start, traces):
+                stop = start + traces.size
+                headers[start:stop] = traces['header']
+
+                with instrumentation.stage('sample decode', traces['data'].nbytes, traces.size):
+                    self.DM.matrix[start:stop] = DataMatrix._unpack_samples(traces['data'], endian, fl)
+
+            with tqdm(total=nt, disable=not progress, **unpack_pbar_params) as pbar:
+                if workers and workers > 1:
+                    for count in gfunc._map_trace_blocks(file, trace_dtype, nt, unpack_block, workers):
+                        pbar.update(count)
+                else:
+                    for start, traces in gfunc._read_trace_blocks(f, trace_dtype, nt):
+                        unpack_block(start, traces)
+                        pbar.update(traces.size)
+
+        self.G._load_from_headers(headers, columns=columns)
+
+    def save_file(self, file, endian='>', progress=False, workers=None):
+        """ Saves self into a specified .sgy file.
+
+        The traces are packed in large blocks: Trace Headers and samples of each
+        block are put into one structured array, which is written at once. With
+        workers, blocks are packed by a pool of threads and written in order.
+
+        The file is written under a temporary name and then moved over the target,
+        so the target is left as it was if the values do not fit into the file.
+        This also makes it safe to save a memory mapped Segy into its own file.
 
-        self.TFH.load_from_file(file)
-        self.BFH.load_from_file(file)
-        self.DM.load_from_file(file, progress=progress)
-        self.G.load_from_file(file)
+        """
 
-    def save_file(self, file, endian='>', progress=False):
-        """ Saves self into a specified .sgy file. """
+        # in lazy mode, the components are loaded here: before the file is written,
+        # and not by the threads that pack the blocks
+        g, matrix = self.G, self.DM.matrix
 
-        ss, fl, _ = sfc[self.BFH['Sample Format']]
-        nt, tl = self.DM.matrix.shape
+        sf = int(self.BFH['Sample Format'])
+        _, fl, _ = sfc[sf]
+        nt, tl = matrix.shape
+        trace_dtype = gfunc._trace_dtype(endian, fl, data_type_map1[sf], tl)
+        traces_per_block = gfunc._traces_per_block(trace_dtype, nt, workers)
 
         self.BFH._update_bytes(endian)
-        self.G._apply_coordinates_scalar_before_packing()
 
-        with open(file, 'bw') as f:
+        def pack_block(start):
+            stop = min(start + traces_per_block, nt)
+
+            with instrumentation.stage('pack', (stop - start) * trace_dtype.itemsize, stop - start):
+                traces = np.zeros(shape=stop - start, dtype=trace_dtype)
+                g._pack_headers(traces['header'], start)
+                traces['data'] = DataMatrix._pack_samples(matrix[start:stop], endian, fl)
+
+            return traces
+
+        # a new file is written and moved over the target, so that the target is kept if packing
+        # fails, and is not truncated while self is memory mapped from it
+        with gfunc._replacing_file(file) as f, tqdm(total=nt, disable=not progress, **pack_pbar_params) as pbar:
             f.write(self.TFH._bytes)
             f.write(self.BFH._bytes)
 
-            if not fl:  # IBM
-                if progress:
-                    with tqdm(total=nt, **pack_pbar_params) as pbar:
-                        for i in range(nt):
-                            raw_header = bytearray(240)
-                            raw_header[:232] = struct.pack(endian + TH_format_string, *self.G.table.loc[i, :].values)
-                            f.write(raw_header)
-
-                            raw_trace = ibm.pack_ibm32_series(endian, self.DM.matrix[i])
-                            f.write(raw_trace)
-                            pbar.update(1)
-                else:
-                    for i in range(nt):
-                        raw_header = bytearray(240)
-                        raw_header[:232] = struct.pack(endian + TH_format_string, *self.G.table.loc[i, :].values)
-                        f.write(raw_header)
-
-                        raw_trace = ibm.pack_ibm32_series(endian, self.DM.matrix[i])
-                        f.write(raw_trace)
-            else:
-                format_string = endian + fl * tl
-                if progress:
-                    with tqdm(total=nt) as pbar:
-                        for i in range(nt):
-                            raw_header = bytearray(240)
-                            raw_header[:232] = struct.pack(endian + TH_format_string, *self.G.table.loc[i, :].values)
-                            f.write(raw_header)
-
-                            raw_trace = struct.pack(format_string, *self.DM.matrix[i])
-                            f.write(raw_trace)
-                            pbar.update(1)
-                else:
-                    for i in range(nt):
-                        raw_header = bytearray(240)
-                        raw_header[:232] = struct.pack(endian + TH_format_string, *self.G.table.loc[i, :].values)
-                        f.write(raw_header)
+            for traces in gfunc._ordered_map(pack_block, range(0, nt, traces_per_block), workers):
+                with instrumentation.stage('write', traces.nbytes, traces.size):
+                    traces.tofile(f)
+                pbar.update(traces.size)
 
-                        raw_trace = struct.pack(format_string, *self.DM.matrix[i])
-                        f.write(raw_trace)
+        SegyFileInfo.invalidate(file)
 
-        self.G._apply_coordinate_scalar_after_unpacking()
+    def to_cache(self, path):
+        """ Saves self into a directory in a format that is fast to load.
 
-    # ----- Extracting parts ----- #
+        The directory contains the raw bytes of the Textual and Binary File Headers,
+        the Data Matrix and the Geometry table in native .npy arrays. Nothing has to be
+        decoded when the cache is loaded back with Segy.from_cache, and the matrix
+        can be memory mapped.
+
+        Parameters
+        ----------
+        path : str
+            Path to the directory to save the cache into. Created if needed.
+
+        """
+
+        os.makedirs(path, exist_ok=True)
+
+        self.BFH._update_bytes(self.BFH.endian or '>')
+        tfh_bytes = self.TFH.text.encode(self.TFH.encoding)
+
+        with open(os.path.join(path, 'headers.bin'), 'bw') as f:
+            f.write(tfh_bytes)
+            f.write(self.BFH._bytes)
+
+        matrix = self.DM.matrix
+        np.save(os.path.join(path, 'matrix.npy'), matrix.astype(matrix.dtype.newbyteorder('='), copy=False))
+
+        geometry = self.G.table.infer_objects().to_records(index=False)
+        np.save(os.path.join(path, 'geometry.npy'), np.asarray(geometry))
+
+    @classmethod
+    def from_cache(cls, path, mmap=True):
+        """ Returns a Segy object loaded from a cache directory created by Segy.to_cache.
+
+        Parameters
+        ----------
+        path : str
+            Path to the cache directory.
+        mmap : bool
+            Map the Data Matrix from the cache instead of reading it (enabled by default).
+            The mapped matrix is read-only.
+
+        """
+
+        out = cls()
+
+        with open(os.path.join(path, 'headers.bin'), 'br') as f:
+            out.TFH.load_from_bytes(f.read(3200))
+            out.BFH.load_from_bytes(f.read(400))
+
+        out.DM.matrix = np.load(os.path.join(path, 'matrix.npy'), mmap_mode='r' if mmap else None)
+        out.DM.dt = out.BFH['Sample Interval'] / 1e3
+        out.DM.t = np.arange(0, out.DM.matrix.shape[1] * out.DM.dt, out.DM.dt)
+
+        out.G.table = pd.DataFrame(np.load(os.path.join(path, 'geometry.npy')))
+
+        return out
+
+    # ----- Reading parts of the file ----- #
+
+    def read_traces(self, indices, t0=None, t1=None):
+        """ Reads only the given traces from the file of self.
+
+        The positions of the traces in the file are calculated directly, only the
+        requested time window is read, and adjacent traces are read in one call.
+        The components of self are not loaded or changed.
+
+        Parameters
+        ----------
+        indices : int, slice or array_like
+            Positions of the traces in the file (starting from 0),
+            or a boolean mask over all of them.
+        t0 : float
+            Start of the time window in ms (inclusive). Defaults to the start of the traces.
+        t1 : float
+            End of the time window in ms (exclusive). Defaults to the end of the traces.
+
+        Returns
+        -------
+        matrix : numpy.ndarray
+            2D array with the samples of the requested traces, in the requested order.
+
+        """
+
+        endian, fl, tl, ss, nt, dtype, si = self._get_file_parameters()
+        trace_size = 240 + ss * tl
+        indices = gfunc._normalize_trace_indices(indices, nt)
+
+        s0, s1 = gfunc._sample_window(t0, t1, si, tl)
+        sample_dtype = gfunc._trace_dtype(endian, fl, dtype, tl)['data'].base
+
+        unique, inverse = np.unique(indices, return_inverse=True)
+        matrix = np.empty(shape=(unique.size, s1 - s0), dtype=dtype)
+
+        with open(self.file, 'br') as f:
+            for position, first, count in gfunc._consecutive_runs(unique):
+                f.seek(3600 + first * trace_size + 240 + s0 * ss)
+                raw = f.read((count - 1) * trace_size + (s1 - s0) * ss)
+
+                samples = np.ndarray(shape=(count, s1 - s0), dtype=sample_dtype, buffer=raw,
+                                     strides=(trace_size, ss))
+                matrix[position:position + count] = DataMatrix._unpack_samples(samples, endian, fl)
+
+        return matrix[inverse]
+
+    def read_headers(self, indices, columns=None):
+        """ Reads only the given Trace Headers from the file of self.
+
+        Works the same way as read_traces, but only the 240 bytes of Trace Headers are read.
+
+        Parameters
+        ----------
+        indices : int, slice or array_like
+            Positions of the traces in the file (starting from 0),
+            or a boolean mask over all of them.
+        columns : list
+            Names of the headers to return. Defaults to all of them.
+
+        Returns
+        -------
+        headers : pandas.DataFrame
+            Trace Headers in the same form as the Geometry table, in the requested order.
+            The index holds the positions of the traces in the file.
+
+        """
+
+        endian, fl, tl, ss, nt, dtype, si = self._get_file_parameters()
+        trace_size = 240 + ss * tl
+        indices = gfunc._normalize_trace_indices(indices, nt)
+        header_dtype = gfunc._trace_header_dtype(endian)
+
+        unique, inverse = np.unique(indices, return_inverse=True)
+        headers = np.empty(shape=unique.size, dtype=header_dtype)
+
+        with open(self.file, 'br') as f:
+            for position, first, count in gfunc._consecutive_runs(unique):
+                f.seek(3600 + first * trace_size)
+                raw = f.read((count - 1) * trace_size + 240)
+
+                headers[position:position + count] = np.ndarray(shape=count, dtype=header_dtype, buffer=raw,
+                                                                strides=(trace_size,))
+
+        g = Geometry()
+        g._load_from_headers(headers[inverse], columns=columns)
+        g.table.index = indices
+
+        return g.table
+
+    # ----- Streaming ----- #
+
+    def iter_chunks(self, n_traces=1000):
+        """ Iterates over the traces in the file of self in chunks of bounded size.
 
-    # TODO: empty and empty_like should fill the TRACENO header
+        Only one chunk is kept in memory at a time, so files larger than memory
+        can be processed. The components of self are not loaded or changed.
+
+        Parameters
+        ----------
+        n_traces : int
+            Maximum number of traces in a chunk.
+
+        Yields
+        ------
+        headers : pandas.DataFrame
+            Trace Headers of the chunk in the same form as the Geometry table. The index
+            holds the positions of the traces in the file.
+        samples : numpy.ndarray
+            Samples of the chunk in the same form as the Data Matrix.
+
+        """
+
+        if not self.file:
+            raise ValueError('Segy has to be loaded from a file to iterate over its traces!')
+
+        endian, fl, tl, ss, nt, dtype, si = SegyFileInfo.from_file(self.file).parameters
+        trace_dtype = gfunc._trace_dtype(endian, fl, dtype, tl)
+
+        with open(self.file, 'br') as f:
+            f.seek(3600)
+            for start, traces in gfunc._read_trace_blocks(f, trace_dtype, nt, n_traces * trace_dtype.itemsize):
+                g = Geometry()
+                g._load_from_headers(traces['header'])
+                g.table.index = range(start, start + traces.size)
+
+                samples = DataMatrix._unpack_samples(traces['data'], endian, fl).astype(dtype)
+
+                yield g.table, samples
+
+    def write_chunks(self, file, chunks, endian='>', progress=False):
+        """ Writes a new .sgy file from chunks of traces, one chunk at a time.
+
+        The Textual and Binary File Headers of self are written first, then the chunks.
+        This is the counterpart of iter_chunks, and can be used with a generator to
+        process files larger than memory:
+
+            sgy.write_chunks(out_file, ((h, process(s)) for h, s in sgy.iter_chunks()))
+
+        Parameters
+        ----------
+        file : str
+            Path to the file to write.
+        chunks : iterable
+            Pairs (headers, samples) as yielded by iter_chunks. The number of samples
+            has to match the Samples / Trace field of the Binary File Header.
+        endian : str
+            Either '>' or '<', for big and little endian respectively.
+        progress : bool
+            Toggle the progress bar (disabled by default).
+
+        """
+
+        sf = int(self.BFH['Sample Format'])
+        ns = int(self.BFH['Samples / Trace'])
+        si = int(self.BFH['Sample Interval'])
+
+        with SegyWriter(file, si, ns, sf, endian, tfh=self.TFH, bfh=self.BFH) as writer, \
+                tqdm(disable=not progress, **pack_pbar_params) as pbar:
+            for headers, samples in chunks:
+                writer.write(samples, headers)
+                pbar.update(samples.shape[0])
+
+    # ----- Internal methods ----- #
+
+    def _subset(self, indices):
+        """ Returns a new Segy object with the given traces of self.
+
+        The Textual File Header is shared, the Binary File Header is copied
+        to hold the new number of traces.
+
+        """
+
+        out = Segy()
+
+        out.TFH = self.TFH
+        out.BFH = BinaryFileHeader()
+        out.BFH.table = self.BFH.table.copy()
+        out.BFH._bytes = self.BFH._bytes
+        out.BFH.endian = self.BFH.endian
+
+        out.DM.matrix = self.DM.matrix[indices]
+        out.DM.dt = self.DM.dt
+        out.DM.t = self.DM.t
+
+        out.G.table = self.G.table.iloc[indices].reset_index(drop=True)
+
+        out.BFH.table['Traces / Ensemble'] = len(indices)
+        if out.BFH['# Traces']:
+            out.BFH.table['# Traces'] = len(indices)
+
+        return out
+
+    def _get_file_parameters(self):
+        """ Returns the parameters of the file of self, reading them if needed. """
+
+        if not self.file:
+            raise ValueError('Segy has to be loaded from a file to read its traces!')
+
+        if self._parameters is None:
+            self._parameters = SegyFileInfo.from_file(self.file).parameters
+
+        return self._parameters
+
+    # ----- Properties ----- #
+
+    @property
+    def DM(self):
+        """ The Data Matrix. In lazy mode, it is loaded from the file on first access. """
+
+        if 'DM' in self._unloaded:
+            # only one thread loads the component, and it is marked as loaded only if loading succeeds
+            with self._load_lock:
+                if 'DM' in self._unloaded:
+                    progress, mmap, workers, _, dtype = self._load_options
+                    self._DM._load_with_parameters(self.file, *self._parameters, progress=progress, mmap=mmap,
+                                                   workers=workers, matrix_dtype=dtype)
+                    self._unloaded.discard('DM')
+
+        return self._DM
+
+    @DM.setter
+    def DM(self, dm):
+        self._unloaded.discard('DM')
+        self._DM = dm
+
+        # store reference to self in the component
+        self._DM._parent = self
+
+    @property
+    def G(self):
+        """ The Geometry. In lazy mode, it is loaded from the file on first access. """
+
+        if 'G' in self._unloaded:
+            with self._load_lock:
+                if 'G' in self._unloaded:
+                    endian, fl, tl, ss, nt, dtype, si = self._parameters
+                    columns = self._load_options[3]
+                    self._G._load_with_parameters(self.file, endian, tl, ss, nt, columns=columns)
+                    self._unloaded.discard('G')
+
+        return self._G
+
+    @G.setter
+    def G(self, g):
+        self._unloaded.discard('G')
+        self._G = g
+
+    # ----- Extracting parts ----- #
 
     def extract_by_fixed_headers(self, fixed_headers):
         """ Returns a new Segy object, whose data is a subset based on given fixed headers.
 
          Args:
+             fixed_headers: Dictionary of format {header name 1: condition 1, ...}
+
+         Notes:
+             A condition can be a single value (header has to be equal to it), a tuple
+             (min, max) (header has to be in the range, ends included, None for an open end),
+             or a list or a set of values (header has to be one of them). All conditions
+             are combined into one boolean mask over the Geometry table.
+
+         """
+
+        mask = gfunc._headers_mask(self.G.table, fixed_headers)
+
+        return self._subset(np.flatnonzero(mask))
+
+    def groupby(self, keys):
+        """ Splits self into ensembles of traces with the same values of given headers.
+
+        The traces are sorted by the headers once, and each ensemble is cut from the
+        sorted order. Within an ensemble, traces keep their original order.
+
+        Args:
+            keys: Name of a header or a list of names.
+
+        Returns:
+            A dictionary {value: Segy object} for a single header, or
+            {(value 1, value 2, ...): Segy object} for a list of headers, ordered by the values.
+
+        """
+
+        single_key = isinstance(keys, str)
+        if single_key:
+            keys = [keys]
+
+        columns = [self.G.table[key].values for key in keys]
+
+        # lexsort uses the last column as the primary key
+        order = np.lexsort(columns[::-1])
+        columns = [column[order] for column in columns]
+
+        boundaries = np.zeros(order.size, dtype=bool)
+        boundaries[:1] = True
+        for column in columns:
+            boundaries[1:] |= column[1:] != column[:-1]
+
+        starts = np.flatnonzero(boundaries)
+        stops = np.append(starts[1:], order.size)
+
+        out = {}
+        for start, stop in zip(starts, stops):
+            values = tuple(column[start].item() for column in columns)
+            out[values[0] if single_key else values] = self._subset(order[start:stop])
+
+        return out
+
+    @classmethod
+    def from_fixed_headers(cls, file, fixed_headers, sidecar_dir=None):
+        """ Returns a new Segy object with only the traces of the file that have given fixed headers.
+
+        Unlike extract_by_fixed_headers, the file is not loaded: the traces are selected
+        with the HeaderIndex of the file (built on first use and stored next to the file,
+        or in sidecar_dir), and only those traces are read from disk.
+
+         Args:
+             file: A path to the file.
              fixed_headers: Dictionary of format {header name 1: fixed value 1, ...}
+             sidecar_dir: Directory to store the HeaderIndex in. Defaults to the directory of the file.
 
          """
 
-        extracted_g = self.G.table.copy()
-        for key, value in fixed_headers.items():
-            extracted_g = extracted_g.loc[extracted_g[key] == value]
+        indices = HeaderIndex(file, sidecar_dir=sidecar_dir).select(fixed_headers)
 
-        extracted_dm = self.DM.matrix[extracted_g.index]
+        out = cls(file, lazy=True)
+        endian, fl, tl, ss, nt, dtype, si = out._parameters
 
-        out = Segy.empty_like(self)
+        dm = DataMatrix()
+        dm.matrix = out.read_traces(indices)
+        dm.dt = si / 1e3
+        dm.t = np.arange(0, tl * dm.dt, dm.dt)
 
-        out.TFH = self.TFH
-        out.BFH = self.BFH
-        out.DM.matrix = extracted_dm
-        out.G.table = extracted_g.reset_index(drop=True)
+        g = Geometry()
+        g.table = out.read_headers(indices).reset_index(drop=True)
+
+        out.DM = dm
+        out.G = g
 
-        out.BFH.table['Traces / Ensemble'] = extracted_dm.shape[0]
+        out.BFH.table['Traces / Ensemble'] = indices.size
+        if out.BFH['# Traces']:
+            out.BFH.table['# Traces'] = indices.size
 
         return out
 
@@ -151,61 +590,21 @@ class Segy:
 
         """
 
-        # TODO: add a test case for this.
-
-        out = cls()
-
-        out.TFH.set_content('Created in philoseismos! With love to programming and seismology.')
-
         if isinstance(segy, str):
-            nt = gfunc.get_number_of_traces(segy)
-            si = gfunc.get_sample_interval(segy)
-            ns = gfunc.get_trace_length(segy)
-
-            out.BFH['Traces / Ensemble'] = nt
-            out.BFH['Sample Interval'] = si
-            out.BFH['Samples / Trace'] = ns
-            out.BFH['Sample Format'] = 5
-
-            out.DM.matrix = np.zeros((nt, ns), dtype=np.float32)
-            out.DM.dt = ns * si / 1e3
-            out.DM.t = np.arange(0, out.DM.dt, out.DM.dt)
-
-            out.G.table = pd.DataFrame(index=range(nt), columns=TH_columns)
-            out.G.table.loc[:, 'FFID'] = 1
-            out.G.table.loc[:, 'CHAN'] = range(1, nt + 1)
-            out.G.table.loc[:, 'DT'] = int(si)
-            out.G.table.loc[:, 'NUMSMP'] = ns
-            out.G.table.fillna(0, inplace=True)
+            shape = gfunc.get_number_of_traces(segy), gfunc.get_trace_length(segy)
+            sample_interval = gfunc.get_sample_interval(segy)
         elif isinstance(segy, Segy):
             shape = segy.DM.matrix.shape
-            out.DM.matrix = np.zeros(shape, dtype=np.float32)
-
-            out.BFH['Traces / Ensemble'] = shape[0]
-            out.BFH['Sample Interval'] = segy.BFH['Sample Interval']
-            out.BFH['Samples / Trace'] = segy.BFH['Samples / Trace']
-            out.BFH['Sample Format'] = 5
-
-            out.DM.dt = out.BFH['Sample Interval'] / 1e3
-            out.DM.t = np.arang(0, shape[0] * out.DM.dt, out.DM.dt)
-
-            out.G.table = pd.DataFrame(index=range(shape[0]), columns=TH_columns)
-            out.G.table.loc[:, 'FFID'] = 1
-            out.G.table.loc[:, 'CHAN'] = range(1, shape[0] + 1)
-            out.G.table.loc[:, 'DT'] = int(segy.BFH['Sample Interval'])
-            out.G.table.loc[:, 'NUMSMP'] = segy.BFH['Samples / Trace']
-            out.G.table.fillna(0, inplace=True)
+            sample_interval = segy.BFH['Sample Interval']
         else:
             raise ValueError('The `segy` parameter has to be either a Segy object or a string')
 
-        return out
+        return cls.empty(shape=shape, sample_interval=sample_interval)
 
     @classmethod
     def empty(cls, shape=(24, 1024), sample_interval=500):
         """ Returns an empty Segy with the given Data Matrix shape. """
 
-        # TODO: add a test case for this.
-
         out = cls()
 
         out.TFH.set_content('Created in philoseismos! With love to programming and seismology.')
@@ -219,11 +618,12 @@ class Segy:
         out.DM.dt = sample_interval / 1e3
         out.DM.t = np.arange(0, shape[1] * out.DM.dt, out.DM.dt)
 
-        out.G.table = pd.DataFrame(index=range(shape[0]), columns=TH_columns)
-        out.G.table.loc[:, 'FFID'] = 1
-        out.G.table.loc[:, 'CHAN'] = range(1, shape[0] + 1)
-        out.G.table.loc[:, 'DT'] = int(sample_interval)
-        out.G.table.loc[:, 'NUMSMP'] = shape[1]
-        out.G.table.fillna(0, inplace=True)
+        # the table is created at once, not column by column
+        out.G.table = pd.DataFrame(np.zeros((shape[0], len(TH_columns)), dtype=np.int32), columns=TH_columns)
+        out.G.table['TRACENO'] = np.arange(1, shape[0] + 1, dtype=np.int32)
+        out.G.table['FFID'] = 1
+        out.G.table['CHAN'] = np.arange(1, shape[0] + 1, dtype=np.int32)
+        out.G.table['DT'] = int(sample_interval)
+        out.G.table['NUMSMP'] = shape[1]
 
         return out
@@ -0,0 +1,173 @@
+""" philoseismos: with passion for the seismic method.
+
+This file defines the SegyDataset object that represents a collection
+of SEG-Y files, like a survey recorded shot by shot.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+from philoseismos.segy import gfunc
+from philoseismos.segy.components.Segy import Segy
+
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+class SegyDataset:
+    """ Collection of SEG-Y files that are treated as one.
+
+    The Geometries of all the files are merged into one table with two additional
+    columns: FILE (position of the file in self.files) and TRACE (position of the
+    trace in that file). Traces are only read from the files when requested.
+
+    """
+
+    def __init__(self, source=None, workers=8):
+        """ Create an empty dataset.
+
+        If source is specified, loads the files from it.
+
+        """
+
+        self.files = []
+        self.segys = []
+        self.table = None
+
+        if source:
+            self.load(source, workers=workers)
+
+    # ----- Loading ----- #
+
+    def load(self, source, workers=8):
+        """ Loads the headers of the files into self.
+
+        Textual and Binary File Headers and Geometries of the files are loaded
+        concurrently by a pool of threads. Data Matrices are not loaded.
+
+        Parameters
+        ----------
+        source : str or list
+            Path to a directory (all .sgy and .segy files in it are loaded),
+            a glob pattern, or a list of paths.
+        workers : int
+            Number of files to load at the same time.
+
+        """
+
+        self.files = self._find_files(source)
+
+        def load_headers(file):
+            sgy = Segy(file, lazy=True)
+            sgy.G  # geometry is loaded on first access
+            return sgy
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            self.segys = list(pool.map(load_headers, self.files))
+
+        tables = []
+        for i, sgy in enumerate(self.segys):
+            table = sgy.G.table.copy()
+            table['FILE'] = i
+            table['TRACE'] = np.arange(len(table))
+            tables.append(table)
+
+        self.table = pd.concat(tables, ignore_index=True) if tables else None
+
+    # ----- Reading traces ----- #
+
+    def read_traces(self, indices, t0=None, t1=None):
+        """ Reads the given traces from whichever files own them.
+
+        Parameters
+        ----------
+        indices : int, slice or array_like
+            Positions of the traces in the merged table (starting from 0),
+            or a boolean mask over all of them.
+        t0 : float
+            Start of the time window in ms, see Segy.read_traces.
+        t1 : float
+            End of the time window in ms, see Segy.read_traces.
+
+        Returns
+        -------
+        matrix : numpy.ndarray
+            2D array with the samples of the requested traces, in the requested order.
+
+        """
+
+        indices = gfunc._normalize_trace_indices(indices, len(self.table))
+        files = self.table['FILE'].values[indices]
+        traces = self.table['TRACE'].values[indices]
+
+        blocks = {file: self.segys[file].read_traces(traces[files == file], t0, t1) for file in np.unique(files)}
+
+        lengths = {block.shape[1] for block in blocks.values()}
+        if len(lengths) > 1:
+            raise ValueError('Requested traces have different number of samples!')
+
+        matrix = np.empty(shape=(indices.size, lengths.pop() if lengths else 0),
+                          dtype=np.result_type(*blocks.values()) if blocks else np.float32)
+
+        for file, block in blocks.items():
+            matrix[files == file] = block
+
+        return matrix
+
+    def extract_by_fixed_headers(self, fixed_headers):
+        """ Returns a new Segy object with the traces of all files that have given fixed headers.
+
+        Conditions are the same as in Segy.extract_by_fixed_headers. Textual and Binary
+        File Headers are taken from the first file with selected traces.
+
+        """
+
+        indices = np.flatnonzero(gfunc._headers_mask(self.table, fixed_headers))
+
+        if indices.size == 0:
+            raise ValueError('No traces have the given headers!')
+
+        first = self.segys[self.table['FILE'].values[indices[0]]]
+
+        out = Segy()
+        out.TFH = first.TFH
+        out.BFH.load_from_bytes(first.BFH._bytes)
+        out.BFH.table['Traces / Ensemble'] = indices.size
+        if out.BFH['# Traces']:
+            out.BFH.table['# Traces'] = indices.size
+
+        out.DM.matrix = self.read_traces(indices)
+        out.DM.dt = first.BFH['Sample Interval'] / 1e3
+        out.DM.t = np.arange(0, out.DM.matrix.shape[1] * out.DM.dt, out.DM.dt)
+
+        out.G.table = self.table.iloc[indices].drop(columns=['FILE', 'TRACE']).reset_index(drop=True)
+
+        return out
+
+    # ----- Dunder methods ----- #
+
+    def __len__(self):
+        return 0 if self.table is None else len(self.table)
+
+    def __repr__(self):
+        return f'SegyDataset of {len(self.files)} files, {len(self)} traces'
+
+    # ----- Static methods ----- #
+
+    @staticmethod
+    def _find_files(source):
+        """ Returns a sorted list of files from a directory, a glob pattern or a list of paths. """
+
+        if isinstance(source, (list, tuple)):
+            return [str(file) for file in source]
+
+        source = str(source)
+
+        if os.path.isdir(source):
+            files = [os.path.join(source, name) for name in os.listdir(source)]
+            return sorted(file for file in files if file.lower().endswith(('.sgy', '.segy')))
+
+        return sorted(glob.glob(source))
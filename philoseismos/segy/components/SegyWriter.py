@@ -0,0 +1,176 @@
+""" philoseismos: with passion for the seismic method.
+
+This file defines the SegyWriter object that writes a SEG-Y file
+incrementally, block of traces by block of traces.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+from philoseismos.segy import gfunc
+from philoseismos.segy.components.TextualFileHeader import TextualFileHeader
+from philoseismos.segy.components.BinaryFileHeader import BinaryFileHeader
+from philoseismos.segy.components.DataMatrix import DataMatrix
+from philoseismos.segy.components.Geometry import Geometry
+from philoseismos.segy.tools.constants import sample_format_codes as sfc
+from philoseismos.segy.tools.constants import data_type_map1
+from philoseismos.segy.tools.file_info import SegyFileInfo
+from philoseismos.segy.tools import instrumentation
+
+import struct
+
+import numpy as np
+import pandas as pd
+
+
+class SegyWriter:
+    """ Writer that appends traces to a new SEG-Y file as they are produced.
+
+    The Textual and Binary File Headers are written when the writer is opened,
+    each call to write() appends a block of traces, and the number of traces in
+    the Binary File Header is set when the writer is closed. Only one block of
+    traces is held in memory at a time:
+
+        with SegyWriter(file, sample_interval=1000, ns=2048) as writer:
+            for shot in shots:
+                writer.write(model(shot), headers={'FFID': shot})
+
+    """
+
+    def __init__(self, path, sample_interval, ns, sample_format=5, endian='>', tfh=None, bfh=None):
+        """ Create a new writer.
+
+        Parameters
+        ----------
+        path : str
+            Path to the file to write.
+        sample_interval : int
+            Sample interval in microseconds.
+        ns : int
+            Number of samples in each trace.
+        sample_format : int
+            Sample format code, see sample_format_codes.
+        endian : str
+            Either '>' or '<', for big and little endian respectively.
+        tfh : TextualFileHeader
+            Textual File Header to write. A default one is created if not given.
+        bfh : BinaryFileHeader
+            Binary File Header to take the values from. Sample interval, number of
+            samples and sample format are set from the parameters of the writer.
+
+        """
+
+        self.path = path
+        self.sample_interval = int(sample_interval)
+        self.ns = int(ns)
+        self.sample_format = int(sample_format)
+        self.endian = endian
+
+        if tfh is None:
+            tfh = TextualFileHeader()
+            tfh.set_content('Created in philoseismos! With love to programming and seismology.')
+
+        self.TFH = tfh
+
+        self.BFH = BinaryFileHeader()
+        if bfh is not None:
+            self.BFH.table = bfh.table.copy()
+
+        self.BFH.table['Sample Interval'] = self.sample_interval
+        self.BFH.table['Samples / Trace'] = self.ns
+        self.BFH.table['Sample Format'] = self.sample_format
+
+        # number of traces written so far
+        self.nt = 0
+
+        _, self._fl, _ = sfc[self.sample_format]
+        self._trace_dtype = gfunc._trace_dtype(endian, self._fl, data_type_map1[self.sample_format], self.ns)
+        self._file = None
+
+    # ----- Writing ----- #
+
+    def open(self):
+        """ Creates the file and writes the Textual and Binary File Headers into it. """
+
+        self.BFH._update_bytes(self.endian)
+
+        self._file = open(self.path, 'bw')
+        self._file.write(self.TFH._bytes)
+        self._file.write(self.BFH._bytes)
+
+    def write(self, samples, headers=None):
+        """ Appends a block of traces to the file.
+
+        Parameters
+        ----------
+        samples : numpy.ndarray
+            2D array with one trace per row, or 1D array with a single trace.
+        headers : pandas.DataFrame or dict
+            Trace Headers of the block: a table like the Geometry table, or a dictionary
+            {header name: value or array of values}. Headers that are not given are zeros,
+            except for TRACENO (numbered from 1 through the whole file), DT and NUMSMP.
+
+        """
+
+        if self._file is None:
+            raise ValueError('SegyWriter has to be opened before writing!')
+
+        samples = np.atleast_2d(samples)
+        n = samples.shape[0]
+
+        if samples.shape[1] != self.ns:
+            raise ValueError(f'Traces have to have {self.ns} samples!')
+
+        with instrumentation.stage('pack', n * self._trace_dtype.itemsize, n):
+            traces = np.zeros(shape=n, dtype=self._trace_dtype)
+            given = []
+
+            if headers is not None:
+                g = Geometry()
+                g.table = headers if isinstance(headers, pd.DataFrame) else pd.DataFrame(headers, index=range(n))
+
+                if len(g.table) != n:
+                    raise ValueError('Number of headers does not match the number of traces!')
+
+                g._pack_headers(traces['header'])
+                given = g.table.columns
+
+            if 'TRACENO' not in given:
+                traces['header']['TRACENO'] = np.arange(self.nt + 1, self.nt + n + 1)
+            if 'DT' not in given:
+                traces['header']['DT'] = self.sample_interval
+            if 'NUMSMP' not in given:
+                traces['header']['NUMSMP'] = self.ns
+
+            traces['data'] = DataMatrix._pack_samples(samples, self.endian, self._fl)
+
+        with instrumentation.stage('write', traces.nbytes, n):
+            traces.tofile(self._file)
+
+        self.nt += n
+
+    def close(self):
+        """ Sets the number of traces in the Binary File Header and closes the file. """
+
+        if self._file is None:
+            return
+
+        self.BFH.table['# Traces'] = self.nt
+
+        self._file.seek(3512)
+        self._file.write(struct.pack(self.endian + 'Q', self.nt))
+        self._file.close()
+        self._file = None
+
+        SegyFileInfo.invalidate(self.path)
+
+    # ----- Dunder methods ----- #
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return f'SegyWriter({self.path!r}: {self.nt} traces x {self.ns} samples written)'
@@ -6,6 +6,8 @@ a Textual File Header of a SEG-Y file.
 @author: Ivan Dubrovin
 e-mail: dubrovin.io@icloud.com """
 
+from philoseismos.segy.tools.file_info import SegyFileInfo
+
 
 class TextualFileHeader:
     """ Textual File Header for the SEG-Y file.
@@ -41,10 +43,7 @@ class TextualFileHeader:
 
         """
 
-        with open(file, 'br') as f:
-            bytes = f.read(3200)
-
-        self.load_from_bytes(bytes)
+        self.load_from_bytes(SegyFileInfo.from_file(file).tfh_bytes)
 
     def replace_in_file(self, file):
         """ Replaces the Textual File Header in the file with self.
@@ -66,6 +65,8 @@ class TextualFileHeader:
         with open(file, 'bw') as f:
             f.write(file_content)
 
+        SegyFileInfo.invalidate(file)
+
     def load_from_bytes(self, bytes):
         """ Unpacks given bytes into self.
 
@@ -0,0 +1,390 @@
+""" philoseismos: with passion for the seismic method.
+
+This file defines the TraceArchive object that stores the traces of a SEG-Y
+file compressed, in chunks that can be read independently.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+from philoseismos.segy import gfunc
+from philoseismos.segy.components.DataMatrix import DataMatrix
+from philoseismos.segy.components.Geometry import Geometry
+from philoseismos.segy.components.Segy import Segy
+from philoseismos.segy.tools.constants import sample_format_codes as sfc
+from philoseismos.segy.tools.constants import data_type_map1, archive_magic
+from philoseismos.segy.tools.file_info import SegyFileInfo
+
+import bz2
+import json
+import lzma
+import struct
+import zlib
+
+import numpy as np
+
+
+# compression codecs from the standard library: name -> (compress(data, level), decompress(data))
+codecs = {
+    'zlib': (lambda data, level: zlib.compress(data, 6 if level is None else level), zlib.decompress),
+    'lzma': (lambda data, level: lzma.compress(data, preset=level), lzma.decompress),
+    'bz2': (lambda data, level: bz2.compress(data, 9 if level is None else level), bz2.decompress),
+    'none': (lambda data, level: bytes(data), bytes),
+}
+
+
+class TraceArchive:
+    """ Compressed archive of the traces of a SEG-Y file.
+
+    Traces are split into chunks with a fixed number of traces. The Trace Headers
+    and the samples of each chunk are compressed separately, and an index of the
+    chunks is kept at the end of the file. The Geometry is read from the header
+    chunks only, and reading a few traces (like a single gather) only
+    decompresses the chunks that hold them.
+
+    Headers and samples are stored exactly as they are in the SEG-Y file, so the
+    file restored with to_segy() is identical to the original one.
+
+    Layout of the file: magic bytes, offset of the index (8 bytes), Textual and
+    Binary File Headers (3600 bytes), chunks, and the index: size of the metadata
+    (8 bytes), the metadata in JSON, and a table with the offset and the size
+    of the headers and of the samples of each chunk.
+
+    """
+
+    def __init__(self, file=None):
+        """ Create an empty Trace Archive.
+
+        If file is specified, opens the archive stored in that file.
+
+        """
+
+        self.file = None
+        self.metadata = None
+
+        self.tfh_bytes = None
+        self.bfh_bytes = None
+
+        # offset and size of the compressed headers and samples of each chunk
+        self.chunks = None
+
+        self._G = None
+
+        if file:
+            self.open(file)
+
+    # ----- Loading, writing ----- #
+
+    def open(self, file):
+        """ Reads the index of the archive stored in the file.
+
+        Parameters
+        ----------
+        file : str
+            Path to the archive.
+
+        """
+
+        with open(file, 'br') as f:
+            if f.read(len(archive_magic)) != archive_magic:
+                raise ValueError('The file is not a trace archive!')
+
+            index_offset, = struct.unpack('<Q', f.read(8))
+            self.tfh_bytes = f.read(3200)
+            self.bfh_bytes = f.read(400)
+
+            f.seek(index_offset)
+            metadata_size, = struct.unpack('<Q', f.read(8))
+            self.metadata = json.loads(f.read(metadata_size).decode())
+            self.chunks = np.fromfile(f, dtype='<u8').reshape(-1, 4)
+
+        self.file = file
+        self._G = None
+
+    @classmethod
+    def from_segy(cls, source, file, chunk_size=1000, codec='zlib', level=None, shuffle=True, endian='>'):
+        """ Writes a new archive from a SEG-Y file or a Segy object.
+
+        A SEG-Y file is archived without being loaded: its traces are read chunk by chunk.
+
+        Parameters
+        ----------
+        source : str or Segy
+            Path to the SEG-Y file, or a Segy object.
+        file : str
+            Path to the archive to write.
+        chunk_size : int
+            Number of traces in one chunk.
+        codec : str
+            Compression codec, one of 'zlib', 'lzma', 'bz2' or 'none'.
+        level : int
+            Compression level (preset for lzma). Defaults to the default of the codec.
+        shuffle : bool
+            Group the bytes of the samples by their significance before compressing.
+            This is lossless and usually improves the compression of floating point data.
+        endian : str
+            Byte order of the archived traces if source is a Segy object.
+            A file keeps its own byte order.
+
+        Returns
+        -------
+        archive : TraceArchive
+            The archive opened from the written file.
+
+        """
+
+        if codec not in codecs:
+            raise ValueError(f'Unknown codec {codec!r}: expected one of {", ".join(codecs)}!')
+
+        if isinstance(source, Segy):
+            tfh_bytes, bfh_bytes, endian, sf, tl, si, blocks = cls._segy_blocks(source, chunk_size, endian)
+        else:
+            tfh_bytes, bfh_bytes, endian, sf, tl, si, blocks = cls._file_blocks(source, chunk_size)
+
+        compress, _ = codecs[codec]
+        chunks = []
+        nt = 0
+
+        with open(file, 'bw') as f:
+            f.write(archive_magic)
+            f.write(struct.pack('<Q', 0))  # offset of the index is set at the end
+            f.write(tfh_bytes)
+            f.write(bfh_bytes)
+
+            for traces in blocks:
+                # raw bytes of each trace, including the unassigned bytes of the Trace Headers
+                raw = traces.view(np.uint8).reshape(traces.size, -1)
+
+                headers = compress(raw[:, :240].tobytes(), level)
+                samples = raw[:, 240:].tobytes()
+                if shuffle:
+                    samples = cls._shuffle(samples, traces.dtype['data'].base.itemsize)
+                samples = compress(samples, level)
+
+                offset = f.tell()
+                f.write(headers)
+                f.write(samples)
+
+                chunks.append((offset, len(headers), offset + len(headers), len(samples)))
+                nt += traces.size
+
+            metadata = json.dumps({
+                'version': 1,
+                'codec': codec,
+                'shuffle': shuffle,
+                'chunk_size': chunk_size,
+                'endian': endian,
+                'sample_format': sf,
+                'sample_interval': si,
+                'trace_length': tl,
+                'number_of_traces': nt,
+            }).encode()
+
+            index_offset = f.tell()
+            f.write(struct.pack('<Q', len(metadata)))
+            f.write(metadata)
+            np.array(chunks, dtype='<u8').reshape(-1, 4).tofile(f)
+
+            f.seek(len(archive_magic))
+            f.write(struct.pack('<Q', index_offset))
+
+        return cls(file)
+
+    def to_segy(self, file):
+        """ Writes the archived traces into a SEG-Y file, one chunk at a time.
+
+        Parameters
+        ----------
+        file : str
+            Path to the SEG-Y file to write.
+
+        """
+
+        with open(file, 'bw') as f:
+            f.write(self.tfh_bytes)
+            f.write(self.bfh_bytes)
+
+            for i in range(len(self.chunks)):
+                self._read_chunk(i).tofile(f)
+
+        SegyFileInfo.invalidate(file)
+
+    def load(self):
+        """ Returns a Segy object with all the archived traces. """
+
+        out = Segy()
+        out.TFH.load_from_bytes(self.tfh_bytes)
+        out.BFH.load_from_bytes(self.bfh_bytes)
+
+        out.DM.matrix = self.read_traces(slice(None))
+        out.DM.dt = self.metadata['sample_interval'] / 1e3
+        out.DM.t = np.arange(0, self.metadata['trace_length'] * out.DM.dt, out.DM.dt)
+
+        out.G.table = self.G.table.copy()
+
+        return out
+
+    # ----- Reading traces ----- #
+
+    def read_traces(self, indices):
+        """ Reads the given traces, decompressing only the chunks that hold them.
+
+        Parameters
+        ----------
+        indices : int, slice or array_like
+            Positions of the traces in the archive (starting from 0),
+            or a boolean mask over all of them.
+
+        Returns
+        -------
+        matrix : numpy.ndarray
+            2D array with the samples of the requested traces, in the requested order.
+
+        """
+
+        indices = gfunc._normalize_trace_indices(indices, len(self))
+        fl = sfc[self.metadata['sample_format']][1]
+        dtype = data_type_map1[self.metadata['sample_format']]
+
+        chunk_size = self.metadata['chunk_size']
+        matrix = np.empty(shape=(indices.size, self.metadata['trace_length']), dtype=dtype)
+
+        with open(self.file, 'br') as f:
+            for chunk in np.unique(indices // chunk_size):
+                mask = indices // chunk_size == chunk
+                samples = self._read_chunk(chunk, f, headers=False)
+                matrix[mask] = DataMatrix._unpack_samples(samples[indices[mask] - chunk * chunk_size],
+                                                          self.metadata['endian'], fl)
+
+        return matrix
+
+    # ----- Properties ----- #
+
+    @property
+    def G(self):
+        """ The Geometry of the archived traces. Only the header chunks are read, on first access. """
+
+        if self._G is None:
+            headers = np.empty(shape=len(self), dtype=gfunc._trace_header_dtype(self.metadata['endian']))
+            chunk_size = self.metadata['chunk_size']
+
+            with open(self.file, 'br') as f:
+                for i in range(len(self.chunks)):
+                    chunk = self._read_chunk(i, f, samples=False)
+                    headers[i * chunk_size:i * chunk_size + chunk.size] = chunk
+
+            self._G = Geometry()
+            self._G._load_from_headers(headers)
+
+        return self._G
+
+    # ----- Dunder methods ----- #
+
+    def __len__(self):
+        return 0 if self.metadata is None else self.metadata['number_of_traces']
+
+    def __repr__(self):
+        return (f'TraceArchive of {len(self)} traces in {len(self.chunks)} chunks, '
+                f'{self.metadata["codec"]} codec')
+
+    # ----- Internal methods ----- #
+
+    def _trace_dtype(self):
+        """ Returns the structured data type of the archived traces. """
+
+        sf = self.metadata['sample_format']
+        fl = sfc[sf][1]
+
+        return gfunc._trace_dtype(self.metadata['endian'], fl, data_type_map1[sf], self.metadata['trace_length'])
+
+    def _read_chunk(self, i, f=None, headers=True, samples=True):
+        """ Returns the i-th chunk as an array of traces, or only its headers or samples.
+
+        If f is given, it is used instead of opening the archive again.
+
+        """
+
+        if f is None:
+            with open(self.file, 'br') as f:
+                return self._read_chunk(i, f, headers, samples)
+
+        _, decompress = codecs[self.metadata['codec']]
+        trace_dtype = self._trace_dtype()
+        sample_dtype = trace_dtype['data'].base
+        header_offset, header_size, data_offset, data_size = (int(value) for value in self.chunks[i])
+
+        if headers:
+            f.seek(header_offset)
+            out_headers = np.frombuffer(decompress(f.read(header_size)), dtype=trace_dtype['header'])
+
+            if not samples:
+                return out_headers
+
+        f.seek(data_offset)
+        raw = decompress(f.read(data_size))
+        if self.metadata['shuffle']:
+            raw = self._unshuffle(raw, sample_dtype.itemsize)
+        out_samples = np.frombuffer(raw, dtype=sample_dtype).reshape(-1, self.metadata['trace_length'])
+
+        if not headers:
+            return out_samples
+
+        # traces are put together from raw bytes, so that the headers are copied exactly
+        traces = np.empty(shape=(out_headers.size, trace_dtype.itemsize), dtype=np.uint8)
+        traces[:, :240] = out_headers.view(np.uint8).reshape(out_headers.size, 240)
+        traces[:, 240:] = out_samples.view(np.uint8).reshape(out_samples.shape[0], -1)
+
+        return traces.view(trace_dtype).reshape(-1)
+
+    # ----- Static methods ----- #
+
+    @staticmethod
+    def _file_blocks(file, chunk_size):
+        """ Returns the headers and parameters of a SEG-Y file, and a generator of its chunks of traces. """
+
+        info = SegyFileInfo.from_file(file)
+        endian, fl, tl, ss, nt, dtype, si = info.parameters
+        trace_dtype = gfunc._trace_dtype(endian, fl, dtype, tl)
+
+        def blocks():
+            with open(file, 'br') as f:
+                f.seek(3600)
+                for _, traces in gfunc._read_trace_blocks(f, trace_dtype, nt, chunk_size * trace_dtype.itemsize):
+                    yield traces
+
+        return info.tfh_bytes, info.bfh_bytes, endian, info.sample_format, tl, si, blocks()
+
+    @staticmethod
+    def _segy_blocks(segy, chunk_size, endian):
+        """ Returns the headers and parameters of a Segy object, and a generator of its packed chunks of traces. """
+
+        sf = int(segy.BFH['Sample Format'])
+        fl = sfc[sf][1]
+        nt, tl = segy.DM.matrix.shape
+        trace_dtype = gfunc._trace_dtype(endian, fl, data_type_map1[sf], tl)
+
+        segy.BFH._update_bytes(endian)
+        tfh_bytes = segy.TFH.text.encode(segy.TFH.encoding)
+
+        def blocks():
+            for start in range(0, nt, chunk_size):
+                stop = min(start + chunk_size, nt)
+
+                traces = np.zeros(shape=stop - start, dtype=trace_dtype)
+                segy.G._pack_headers(traces['header'], start)
+                traces['data'] = DataMatrix._pack_samples(segy.DM.matrix[start:stop], endian, fl)
+
+                yield traces
+
+        return tfh_bytes, segy.BFH._bytes, endian, sf, tl, int(segy.BFH['Sample Interval']), blocks()
+
+    @staticmethod
+    def _shuffle(raw, itemsize):
+        """ Returns the bytes of the values grouped by significance: all first bytes, then all second bytes, etc. """
+
+        return np.frombuffer(raw, dtype=np.uint8).reshape(-1, itemsize).T.tobytes()
+
+    @staticmethod
+    def _unshuffle(raw, itemsize):
+        """ Reverts TraceArchive._shuffle. """
+
+        return np.frombuffer(raw, dtype=np.uint8).reshape(itemsize, -1).T.tobytes()
@@ -7,4 +7,8 @@ from philoseismos.segy.components.TextualFileHeader import TextualFileHeader
 from philoseismos.segy.components.BinaryFileHeader import BinaryFileHeader
 from philoseismos.segy.components.DataMatrix import DataMatrix
 from philoseismos.segy.components.Geometry import Geometry
+from philoseismos.segy.components.HeaderIndex import HeaderIndex
+from philoseismos.segy.components.SegyWriter import SegyWriter
 from philoseismos.segy.components.Segy import Segy
+from philoseismos.segy.components.SegyDataset import SegyDataset
+from philoseismos.segy.components.TraceArchive import TraceArchive
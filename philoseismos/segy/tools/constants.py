@@ -16,7 +16,7 @@ sample_format_codes = {
     2: (4, 'i', '4-byte signed integer'),
     3: (2, 'h', '2-byte signed integer'),
     5: (4, 'f', '4-byte IEEE floating-point'),
-    6: (4, 'd', '8-byte IEEE floating-point'),
+    6: (8, 'd', '8-byte IEEE floating-point'),
     8: (1, 'b', '1-byte signed integer'),
     9: (8, 'q', '8-byte signed integer'),
     10: (4, 'L', '4-byte, unsigned integer'),
@@ -183,9 +183,15 @@ TH_columns = ['TRACENO',  # ordinal number of a trace
               'Source Measurement Unit']
 # then go 8 byte of a "Header name" - ASCII or EBCID
 
+# trace headers that the coordinate scalar (COORDSC) applies to
+TH_coordinate_columns = ['SOU_X', 'SOU_Y', 'REC_X', 'REC_Y', 'CDP_X', 'CDP_Y', 'OFFSET']
+
 # a dictionary that maps sample format codes from BFH
-# to the numpy.dtype for DataMatrix
-data_type_map1 = {1: np.float64,
+# to the numpy.dtype for DataMatrix: the smallest type that holds
+# the values exactly; for IBM floats, float32 covers the 24-bit mantissa,
+# but not the exponent range (up to about 7.2e75 and down to about 5.4e-79):
+# values outside of the float32 range become inf or 0, use float64 for them
+data_type_map1 = {1: np.float32,
                   2: np.int32,
                   3: np.int16,
                   5: np.float32,
@@ -193,7 +199,9 @@ data_type_map1 = {1: np.float64,
                   8: np.int8,
                   9: np.int64,
                   10: np.uint32,
-                  11: np.uint16}
+                  11: np.uint16,
+                  12: np.uint64,
+                  16: np.uint8}
 
 # a dictionary that maps the dtype of the matrix to
 # the sample format code for BFH
@@ -204,7 +212,20 @@ data_type_map2 = {np.float32: 5,
                   np.int8: 8,
                   np.int64: 9,
                   np.uint32: 10,
-                  np.uint16: 11}
+                  np.uint16: 11,
+                  np.uint64: 12,
+                  np.uint8: 16}
+
+# the data section of a file is read and written in blocks
+# of whole traces that take up about this many bytes
+data_block_size = 64 * 1024 ** 2
+
+# first bytes of a file written by TraceArchive
+archive_magic = b'PHSARC01'
+
+# maximum number of files with cached parameters (see SegyFileInfo);
+# each cached object keeps 3600 bytes of file headers, about 15 MB in total
+file_info_cache_size = 2 ** 12
 
 unpack_pbar_params = {
     'desc': 'Unpacking traces: ',
@@ -215,3 +236,8 @@ pack_pbar_params = {
     'desc': 'Packing traces: ',
     'unit': ' tr',
 }
+
+resort_pbar_params = {
+    'desc': 'Re-sorting traces: ',
+    'unit': ' tr',
+}
@@ -0,0 +1,152 @@
+""" philoseismos: with passion for the seismic method.
+
+This file defines the SegyFileInfo object that holds the parameters
+of a SEG-Y file, parsed once from its Textual and Binary File Headers.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+from philoseismos.segy.tools import general_functions as gfunc
+from philoseismos.segy.tools.constants import file_info_cache_size
+
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+
+class SegyFileInfo:
+    """ Immutable parameters of a SEG-Y file.
+
+    Use SegyFileInfo.from_file() to get the parameters of a file: they are parsed
+    once and cached, and the cached object is reused until the size or the
+    modification time of the file changes. Functions of this library that change
+    the Binary File Header of a file invalidate its cached parameters as well.
+
+    """
+
+    __slots__ = ('file', 'file_size', 'mtime', 'tfh_bytes', 'bfh_bytes', 'endian', 'sample_format',
+                 'format_letter', 'sample_size', 'dtype', 'sample_interval', 'trace_length',
+                 'number_of_traces', 'fixed_length_flag')
+
+    # cached objects, by absolute path of the file
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, file, file_size, mtime, tfh_bytes, bfh_bytes):
+        """ Parses the parameters from the bytes of the Textual and Binary File Headers.
+
+        Parameters
+        ----------
+        file : str
+            Path to the SEG-Y file.
+        file_size : int
+            Size of the file in bytes.
+        mtime : int
+            Modification time of the file in nanoseconds.
+        tfh_bytes : bytes
+            3200 bytes of the Textual File Header.
+        bfh_bytes : bytes
+            400 bytes of the Binary File Header.
+
+        """
+
+        endian, fl, tl, ss, nt, dtype, si = gfunc._get_parameters_from_bytes(bfh_bytes, file_size)
+
+        values = dict(
+            file=file,
+            file_size=file_size,
+            mtime=mtime,
+            tfh_bytes=bytes(tfh_bytes),
+            bfh_bytes=bytes(bfh_bytes),
+            endian=endian,
+            sample_format=struct.unpack(endian + 'h', bfh_bytes[24:26])[0],
+            format_letter=fl,
+            sample_size=ss,
+            dtype=dtype,
+            sample_interval=si,
+            trace_length=tl,
+            number_of_traces=nt,
+            fixed_length_flag=struct.unpack(endian + 'h', bfh_bytes[302:304])[0] == 1,
+        )
+
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    # ----- Loading ----- #
+
+    @classmethod
+    def from_file(cls, file):
+        """ Returns the parameters of the file, parsing them only if they are not cached.
+
+        Parameters
+        ----------
+        file : str
+            Path to the SEG-Y file.
+
+        Returns
+        -------
+        info : SegyFileInfo
+            Parameters of the file.
+
+        """
+
+        path = os.path.abspath(file)
+        stat = os.stat(path)
+
+        with cls._lock:
+            info = cls._cache.get(path)
+            if info is not None and info.file_size == stat.st_size and info.mtime == stat.st_mtime_ns:
+                cls._cache.move_to_end(path)
+                return info
+
+        with open(path, 'br') as f:
+            headers = f.read(3600)
+
+        info = cls(path, stat.st_size, stat.st_mtime_ns, headers[:3200], headers[3200:])
+
+        with cls._lock:
+            cls._cache[path] = info
+            if len(cls._cache) > file_info_cache_size:
+                cls._cache.popitem(last=False)
+
+        return info
+
+    @classmethod
+    def invalidate(cls, file=None):
+        """ Removes the cached parameters of the file, or of all the files if file is None. """
+
+        with cls._lock:
+            if file is None:
+                cls._cache.clear()
+            else:
+                cls._cache.pop(os.path.abspath(file), None)
+
+    # ----- Properties ----- #
+
+    @property
+    def trace_size(self):
+        """ Size of one trace (header and samples) in bytes. """
+
+        return 240 + self.sample_size * self.trace_length
+
+    @property
+    def parameters(self):
+        """ Tuple (endian, format letter, trace length, sample size, number of traces,
+        numpy data type, sample interval), same as gfunc._get_parameters_from_bytes. """
+
+        return (self.endian, self.format_letter, self.trace_length, self.sample_size,
+                self.number_of_traces, self.dtype, self.sample_interval)
+
+    # ----- Dunder methods ----- #
+
+    def __setattr__(self, name, value):
+        raise AttributeError('SegyFileInfo is immutable!')
+
+    def __delattr__(self, name):
+        raise AttributeError('SegyFileInfo is immutable!')
+
+    def __repr__(self):
+        return (f'SegyFileInfo({self.file!r}: {self.number_of_traces} traces x {self.trace_length} samples, '
+                f'format {self.sample_format}, {self.sample_interval} us, endian {self.endian!r})')
+
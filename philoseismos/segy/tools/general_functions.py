@@ -4,9 +4,19 @@
 e-mail: dubrovin.io@icloud.com """
 
 from philoseismos.segy.tools.constants import sample_format_codes as sfc
+from philoseismos.segy.tools.constants import data_type_map1, data_block_size
+from philoseismos.segy.tools.constants import TH_columns, TH_format_string
+from philoseismos.segy.tools import instrumentation
 
+import os
+import secrets
+import shutil
 import struct
-import os.path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
 
 
 # ----- Getting values ----- #
@@ -16,59 +26,31 @@ def get_endianness(file):
 
     Returns '>' for big and '<' for little endian.
 
-    Grabs the bytes that encode the Sample Format code in the
-    Binary File Header from the specified file, and checks whether big or
-    little endian give the value that corresponds to sample format codes
-    described in SEG-Y file format description.
+    Checks whether big or little endian give the value of the Sample Format code
+    in the Binary File Header that corresponds to sample format codes described
+    in SEG-Y file format description.
 
     """
 
-    with open(file, 'br') as f:
-        f.seek(3224)
-        sf_bytes = f.read(2)
-
-    return _detect_endianness_from_sample_format_bytes(sf_bytes)
+    return _file_info(file).endian
 
 
 def get_sample_format(file):
     """ Returns a tuple (sample size, format letter for srtuct, verbose description). """
 
-    with open(file, 'br') as f:
-        f.seek(3224)
-        sf_bytes = f.read(2)
-
-    endian = _detect_endianness_from_sample_format_bytes(sf_bytes)
-    sf = struct.unpack(endian + 'h', sf_bytes)[0]
-
-    return sfc[sf]
+    return sfc[_file_info(file).sample_format]
 
 
 def get_sample_interval(file):
     """ Returns Sample Interval of specified file in microseconds. """
 
-    with open(file, 'br') as f:
-        f.seek(3216)
-        si_bytes = f.read(2)
-        f.seek(3224)
-        sf_bytes = f.read(2)
-
-    endian = _detect_endianness_from_sample_format_bytes(sf_bytes)
-
-    return struct.unpack(endian + 'h', si_bytes)[0]
+    return _file_info(file).sample_interval
 
 
 def get_trace_length(file):
     """ Returns trace length in specified file in samples. """
 
-    with open(file, 'br') as f:
-        f.seek(3220)
-        tl_bytes = f.read(2)
-        f.seek(3224)
-        sf_bytes = f.read(2)
-
-    endian = _detect_endianness_from_sample_format_bytes(sf_bytes)
-
-    return struct.unpack(endian + 'h', tl_bytes)[0]
+    return _file_info(file).trace_length
 
 
 def get_number_of_traces(file):
@@ -80,16 +62,7 @@ def get_number_of_traces(file):
 
     """
 
-    with open(file, 'br') as f:
-        f.seek(3224)
-        sf_bytes = f.read(2)
-        f.seek(3512)
-        nt_bytes = f.read(8)
-
-    endian = _detect_endianness_from_sample_format_bytes(sf_bytes)
-    number = struct.unpack(endian + 'Q', nt_bytes)[0]
-
-    return number if number != 0 else _calculate_number_of_traces(file)
+    return _file_info(file).number_of_traces
 
 
 # ----- Getting values with a little interpretation ----- #
@@ -97,19 +70,9 @@ def get_number_of_traces(file):
 def get_trace_length_in_ms(file):
     """ Returns trace length in specified file in milliseconds. """
 
-    with open(file, 'br') as f:
-        f.seek(3216)
-        si_bytes = f.read(2)
-        f.seek(3220)
-        tl_bytes = f.read(2)
-        f.seek(3224)
-        sf_bytes = f.read(2)
+    info = _file_info(file)
 
-    endian = _detect_endianness_from_sample_format_bytes(sf_bytes)
-    trace_length = struct.unpack(endian + 'h', tl_bytes)[0]
-    sample_interval = struct.unpack(endian + 'h', si_bytes)[0]
-
-    return (trace_length - 1) * sample_interval / 1000
+    return (info.trace_length - 1) * info.sample_interval / 1000
 
 
 def get_sample_frequency(file):
@@ -131,13 +94,7 @@ def check_fixed_trace_length_flag(file):
 
     """
 
-    endian = get_endianness(file)
-
-    with open(file, 'br') as f:
-        f.seek(3502)
-        ftlf_bytes = f.read(2)
-
-    return True if struct.unpack(endian + 'h', ftlf_bytes) == 1 else False
+    return _file_info(file).fixed_length_flag
 
 
 # ----- Setting values ----- #
@@ -156,6 +113,8 @@ def set_sample_format(file, value):
         f.seek(3224)
         f.write(struct.pack(endian + 'h', value))
 
+    _invalidate_file_info(file)
+
 
 def set_sample_interval(file, value):
     """ Set the Sample Interval in the file to the specified value.
@@ -171,6 +130,8 @@ def set_sample_interval(file, value):
         f.seek(3216)
         f.write(struct.pack(endian + 'h', value))
 
+    _invalidate_file_info(file)
+
 
 # ----- Internal functions ----- #
 
@@ -190,24 +151,309 @@ def _detect_endianness_from_sample_format_bytes(sample_format_bytes):
         return '<'
 
 
-def _calculate_number_of_traces(file):
-    """ Returns calculated number of traces. """
+def _get_parameters_from_bytes(bfh_bytes, file_size):
+    """ Returns all the parameters needed to read the traces.
 
-    file_size = os.path.getsize(file)
-    data_size = file_size - 3600  # exclude Textual and Binary file headers
+    Parameters are extracted from the 400 bytes of the Binary File Header,
+    so a file that is already opened does not need to be read again.
 
-    with open(file, 'br') as f:
-        f.seek(3220)
-        tl_bytes = f.read(2)
-        f.seek(3224)
-        sf_bytes = f.read(2)
+    Parameters
+    ----------
+    bfh_bytes : bytes
+        400 bytes of the Binary File Header.
+    file_size : int
+        Size of the whole file in bytes, used when the number of traces
+        is not specified in the Binary File Header.
 
+    Returns
+    -------
+    A tuple (endian, format letter, trace length, sample size, number of traces,
+    numpy data type, sample interval), same as DataMatrix._get_parameters_from_file.
+
+    """
+
+    sf_bytes = bfh_bytes[24:26]
     endian = _detect_endianness_from_sample_format_bytes(sf_bytes)
 
-    trace_length = struct.unpack(endian + 'h', tl_bytes)[0]
+    si = struct.unpack(endian + 'h', bfh_bytes[16:18])[0]
+    tl = struct.unpack(endian + 'h', bfh_bytes[20:22])[0]
     sf = struct.unpack(endian + 'h', sf_bytes)[0]
-    sample_size, _, _ = sfc[sf]
+    nt = struct.unpack(endian + 'Q', bfh_bytes[312:320])[0]
+
+    sample_size, format_letter, _ = sfc[sf]
+    dtype = data_type_map1[sf]
+
+    if nt == 0:
+        data_size = file_size - 3600
+        nt = int(data_size / (sample_size * tl + 240))
+
+    return endian, format_letter, tl, sample_size, nt, dtype, si
+
+
+def _read_trace_blocks(f, trace_dtype, nt, block_size=data_block_size):
+    """ Reads the traces from an opened file in large blocks.
+
+    The file position has to be at the start of the first trace to read.
+    Yields tuples (index of the first trace in the block, array of traces),
+    where each array has the structured trace_dtype.
+
+    """
+
+    traces_per_block = max(1, block_size // trace_dtype.itemsize)
+
+    for start in range(0, nt, traces_per_block):
+        count = min(traces_per_block, nt - start)
+
+        with instrumentation.stage('read', count * trace_dtype.itemsize, count):
+            raw = f.read(count * trace_dtype.itemsize)
+
+        yield start, np.frombuffer(raw, dtype=trace_dtype, count=count)
+
+
+def _normalize_trace_indices(indices, nt):
+    """ Returns given trace indices as an array of non-negative integers.
+
+    Indices can be an integer, a slice, an array of integers or a boolean
+    mask over all the traces. Negative indices count from the end, as usual in Python.
+
+    """
+
+    if isinstance(indices, slice):
+        return np.arange(*indices.indices(nt))
+
+    indices = np.atleast_1d(np.asarray(indices))
+
+    if indices.dtype == bool:
+        if indices.shape != (nt,):
+            raise IndexError(f'Boolean mask of traces has to have {nt} values!')
+        return np.flatnonzero(indices)
+
+    if indices.size and indices.dtype.kind not in 'iu':
+        raise IndexError('Trace indices have to be integers or a boolean mask!')
+
+    indices = indices.astype(np.int64)
+
+    if np.any((indices >= nt) | (indices < -nt)):
+        raise IndexError('Trace index is out of range!')
+
+    return np.where(indices < 0, indices + nt, indices)
+
+
+def _sample_window(t0, t1, si, tl):
+    """ Returns the indices (first, last + 1) of samples in a time window.
+
+    The window includes t0 and excludes t1, both in ms. None stands for the
+    start and the end of the traces respectively.
+
+    """
+
+    dt = si / 1e3
+
+    s0 = 0 if t0 is None else min(max(int(np.ceil(t0 / dt)), 0), tl)
+    s1 = tl if t1 is None else min(max(int(np.ceil(t1 / dt)), s0), tl)
+
+    return s0, s1
+
+
+def _consecutive_runs(indices):
+    """ Splits sorted unique indices into runs of consecutive values.
+
+    Yields tuples (position of the run in indices, first index, length of the run).
+
+    """
+
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    starts = np.concatenate([[0], breaks])
+    stops = np.concatenate([breaks, [indices.size]])
+
+    for start, stop in zip(starts, stops):
+        if stop > start:
+            yield int(start), int(indices[start]), int(stop - start)
+
+
+def _headers_mask(table, conditions):
+    """ Returns a boolean mask of the rows of a table that satisfy all the conditions.
+
+    Parameters
+    ----------
+    table : pandas.DataFrame
+        Table of Trace Headers, like the Geometry table.
+    conditions : dict
+        Dictionary of format {header name: condition}. A condition is either a single
+        value (equality), a tuple (min, max) (inclusive range, None for an open end),
+        or a list, a set, or an array of values (membership).
+
+    """
+
+    mask = np.ones(len(table), dtype=bool)
+
+    for key, condition in conditions.items():
+        values = table[key].values
+
+        if isinstance(condition, tuple):
+            low, high = condition
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        elif isinstance(condition, (list, set, frozenset, range, np.ndarray)):
+            mask &= np.isin(values, list(condition))
+        else:
+            mask &= values == condition
+
+    return mask
+
+
+def _trace_header_dtype(endian):
+    """ Returns a structured numpy dtype that describes one Trace Header.
+
+    Each field corresponds to one of the TH_columns, with the size given by
+    the TH_format_string. The header is padded to the full 240 bytes.
+
+    """
+
+    formats = [endian + letter for letter in TH_format_string]
+
+    return np.dtype({'names': TH_columns, 'formats': formats, 'itemsize': 240})
+
+
+def _traces_per_block(trace_dtype, nt, workers=None, block_size=data_block_size):
+    """ Returns the number of traces in one block when reading or writing.
+
+    Blocks are limited by block_size, and when several workers are used,
+    the traces are split so that each worker gets at least one block.
+
+    """
+
+    traces_per_block = max(1, block_size // trace_dtype.itemsize)
+
+    if workers and workers > 1:
+        traces_per_block = max(1, min(traces_per_block, -(-nt // workers)))
+
+    return traces_per_block
+
+
+def _map_trace_blocks(file, trace_dtype, nt, function, workers):
+    """ Reads the traces from the file in blocks with a pool of threads.
+
+    Each thread opens the file on its own, reads a block of traces and calls
+    function(index of the first trace in the block, array of traces) for it.
+    Yields the number of traces in each processed block as soon as it is done.
+
+    """
+
+    traces_per_block = _traces_per_block(trace_dtype, nt, workers)
+
+    def process_block(start):
+        count = min(traces_per_block, nt - start)
+
+        with instrumentation.stage('read', count * trace_dtype.itemsize, count), open(file, 'br') as f:
+            f.seek(3600 + start * trace_dtype.itemsize)
+            raw = f.read(count * trace_dtype.itemsize)
+
+        function(start, np.frombuffer(raw, dtype=trace_dtype, count=count))
+        return count
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_block, start) for start in range(0, nt, traces_per_block)]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _ordered_map(function, iterable, workers=None):
+    """ Yields function(item) for each item, computed by a pool of threads.
+
+    Results are yielded in the order of the items. At most twice as many items
+    as there are workers are processed ahead, to keep the memory bounded.
+    Without workers, items are processed one by one in the calling thread.
+
+    """
+
+    if not workers or workers <= 1:
+        for item in iterable:
+            yield function(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+
+        for item in iterable:
+            if len(pending) == 2 * workers:
+                yield pending.popleft().result()
+            pending.append(pool.submit(function, item))
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def _trace_dtype(endian, format_letter, dtype, tl):
+    """ Returns a structured numpy dtype that describes one trace in the file.
+
+    Each trace is a Trace Header followed by the samples. This allows to view
+    the whole data section of the file as an array of traces. IBM values
+    (format letter is None) are described as 4 byte unsigned integers.
+
+    """
+
+    sample_dtype = np.dtype(dtype if format_letter else np.uint32).newbyteorder(endian)
+
+    return np.dtype([('header', _trace_header_dtype(endian)), ('data', sample_dtype, (tl,))])
+
+
+@contextmanager
+def _replacing_file(file):
+    """ Opens a new file next to the given one for writing, and moves it over the file when done.
+
+    The file is only replaced if the writing succeeds, and it is never truncated
+    while it may still be read (e.g. memory mapped). The permissions of an
+    existing file are kept.
+
+    """
+
+    directory, name = os.path.split(os.path.abspath(file))
+
+    while True:
+        temporary = os.path.join(directory, f'.{name}.{secrets.token_hex(4)}.tmp')
+        try:
+            f = open(temporary, 'xb')
+            break
+        except FileExistsError:
+            continue
+
+    try:
+        with f:
+            yield f
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+    if os.path.exists(file):
+        shutil.copymode(file, temporary)
+
+    os.replace(temporary, file)
+
+
+def _calculate_number_of_traces(file):
+    """ Returns calculated number of traces. """
+
+    info = _file_info(file)
+    data_size = info.file_size - 3600  # exclude Textual and Binary file headers
+
+    return int(data_size / info.trace_size)  # each trace has a 240 byte header
+
+
+def _file_info(file):
+    """ Returns the cached SegyFileInfo of the file. """
+
+    # imported here, since file_info itself uses this module
+    from philoseismos.segy.tools.file_info import SegyFileInfo
+
+    return SegyFileInfo.from_file(file)
+
+
+def _invalidate_file_info(file):
+    """ Removes the cached SegyFileInfo of the file after its headers were changed. """
 
-    trace_size = trace_length * sample_size
+    from philoseismos.segy.tools.file_info import SegyFileInfo
 
-    return int(data_size / (trace_size + 240))  # each trace has a 240 byte header
+    SegyFileInfo.invalidate(file)
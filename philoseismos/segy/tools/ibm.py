@@ -9,6 +9,8 @@ e-mail: dubrovin.io@icloud.com """
 import struct
 from math import frexp, ceil
 
+import numpy as np
+
 
 def unpack_ibm32(bytearray_: bytearray, endian: str) -> float:
     """ Unpacks a bytearray containing the 4 byte IBM floating point value.
@@ -122,3 +124,94 @@ def pack_ibm32_series(endian: str, values: list) -> bytearray:
     for i, value in enumerate(values):
         out[i * 4: (i + 1) * 4] = pack_ibm32(value=value, endian=endian)
     return out
+
+
+##################################################################
+
+
+def unpack_ibm32_array(endian: str, buffer, dtype=np.float32) -> np.ndarray:
+    """ Unpacks a whole buffer of IBM values at once.
+
+    Works the same way as unpack_ibm32, but with array bit operations
+    instead of Python level arithmetic.
+
+    Parameters
+    ----------
+    endian : str
+        Either '>' or '<', for big and little endian respectively.
+    buffer : bytes, bytearray or numpy.ndarray
+        Raw bytes to unpack, or an array of 4 byte unsigned integers that
+        already holds the IBM words (its shape is preserved).
+    dtype : type
+        Data type of the returned array. Defaults to numpy.float32, which
+        covers the 24 bit fraction of the IBM values exactly. Values beyond
+        the range of float32 become inf or 0, use numpy.float64 to keep them.
+
+    Returns
+    -------
+    values : numpy.ndarray
+        Unpacked values.
+
+    """
+
+    if isinstance(buffer, np.ndarray) and buffer.dtype.kind == 'u' and buffer.dtype.itemsize == 4:
+        words = buffer
+    else:
+        words = np.frombuffer(buffer, dtype=endian + 'u4')
+
+    # in native byte order from here on
+    words = words.astype(np.uint32, copy=False)
+
+    sign = (words >> 31).astype(np.int8)
+    exponent = ((words >> 24) & 0b1111111).astype(np.int32)
+    fraction = (words & 0b111111111111111111111111).astype(np.float64)
+
+    # value = (-1) ** sign * fraction / pow(2, 24) * pow(16, exponent - 64)
+    values = np.ldexp(fraction, 4 * (exponent - 64) - 24)
+    values[sign == 1] *= -1
+
+    return values.astype(dtype, copy=False)
+
+
+def pack_ibm32_array(endian: str, values) -> np.ndarray:
+    """ Packs an array of values into an array of IBM words.
+
+    Works the same way as pack_ibm32, but with array bit operations
+    instead of Python level arithmetic.
+
+    Parameters
+    ----------
+    endian : str
+        Either '>' or '<', for big and little endian respectively.
+    values : array_like
+        Values to pack.
+
+    Returns
+    -------
+    words : numpy.ndarray
+        Array of 4 byte unsigned integers with the given endianness, of the
+        same shape as values. Use .tobytes() to get the raw bytes.
+
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    absolute = np.abs(values)
+    nonzero = absolute != 0
+
+    if np.any(~np.isfinite(absolute) | (absolute > 7.2370051459731155e+75)):
+        raise ValueError('The value is too large to be packed as IBM!')
+    if np.any(nonzero & (absolute < 5.397605346934028e-79)):
+        raise ValueError('The value is too small to be packed as IBM!')
+
+    # value = M * pow(2, E) = N * pow(16, F), see pack_ibm32 for details
+    M, E = np.frexp(absolute)
+    F = -(-E // 4)  # rounded up
+    N = np.ldexp(M, E - 4 * F + 24).astype(np.uint32)
+
+    sign = (values < 0).astype(np.uint32)
+    F = (F + 64).astype(np.uint32)
+
+    words = (((sign << 7) | F) << 24) | N
+    words[~nonzero] = 0
+
+    return words.astype(endian + 'u4')
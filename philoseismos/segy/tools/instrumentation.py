@@ -0,0 +1,181 @@
+""" philoseismos: with passion for the seismic method.
+
+This file defines the instrumentation of the SEG-Y reading and writing
+pipeline: stages of the pipeline report their timing to registered hooks.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+# functions that are called with the record of each finished stage
+_hooks = []
+
+# fields of a record, in the order of the columns of Recorder.to_dataframe()
+record_fields = ['stage', 'start', 'seconds', 'bytes', 'traces', 'traces_per_second', 'bytes_per_second',
+                 'peak_memory']
+
+
+def add_hook(hook):
+    """ Registers a function that is called with the record of each finished stage.
+
+    A record is a dictionary with the fields listed in record_fields. Hooks can be
+    called from several threads at the same time, when blocks of traces are
+    processed in parallel.
+
+    """
+
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    """ Unregisters a function added with add_hook. """
+
+    _hooks.remove(hook)
+
+
+@contextmanager
+def stage(name, n_bytes=0, n_traces=0):
+    """ Measures one stage of the pipeline and reports it to the hooks.
+
+    Yields the record of the stage, so that the number of bytes and traces
+    can be set in the record when they are only known inside the stage.
+    When no hooks are registered, nothing is measured.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage, like 'read' or 'sample decode'.
+    n_bytes : int
+        Number of bytes read, written or processed by the stage.
+    n_traces : int
+        Number of traces processed by the stage.
+
+    """
+
+    if not _hooks:
+        yield {}
+        return
+
+    record = {'stage': name, 'start': time.time(), 'bytes': n_bytes, 'traces': n_traces}
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        memory_before = tracemalloc.get_traced_memory()[0]
+        if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+            tracemalloc.reset_peak()
+
+    t0 = time.perf_counter()
+    yield record
+    seconds = time.perf_counter() - t0
+
+    record['seconds'] = seconds
+    record['traces_per_second'] = record['traces'] / seconds if seconds else None
+    record['bytes_per_second'] = record['bytes'] / seconds if seconds else None
+    record['peak_memory'] = tracemalloc.get_traced_memory()[1] - memory_before if tracing else None
+
+    for hook in list(_hooks):
+        hook(record)
+
+
+class Recorder:
+    """ Hook that keeps the records of the stages.
+
+    Use it as a context manager around the code to measure:
+
+        with Recorder() as recorder:
+            sgy = Segy(file)
+
+        recorder.summary()
+
+    Stages can be nested (for example, 'scalar application' is a part of
+    'geometry decode'), and with workers the stages of different blocks overlap,
+    so the times of the stages do not have to add up to the total time.
+
+    """
+
+    def __init__(self, trace_memory=False):
+        """ Create an empty recorder.
+
+        If trace_memory is True, tracemalloc is started while the recorder is
+        active, and the peak allocation of each stage is recorded. Tracing the
+        memory slows the pipeline down, so it is disabled by default.
+
+        """
+
+        self.records = []
+        self.trace_memory = trace_memory
+
+        self._started_tracing = False
+
+    # ----- Recording ----- #
+
+    def start(self):
+        """ Registers self as a hook. """
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+        add_hook(self)
+
+    def stop(self):
+        """ Unregisters self. """
+
+        remove_hook(self)
+
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    # ----- Exporting ----- #
+
+    def to_dataframe(self):
+        """ Returns the records as a table, one row per finished stage. """
+
+        return pd.DataFrame(self.records, columns=record_fields)
+
+    def to_json(self, file=None):
+        """ Returns the records as a JSON string, and saves it into the file if it is given. """
+
+        text = json.dumps(self.records)
+
+        if file:
+            with open(file, 'w') as f:
+                f.write(text)
+
+        return text
+
+    def summary(self):
+        """ Returns the totals for each stage: number of calls, time, bytes, traces and throughput. """
+
+        table = self.to_dataframe()
+        summary = table.groupby('stage', sort=False).agg(calls=('stage', 'size'), seconds=('seconds', 'sum'),
+                                                         bytes=('bytes', 'sum'), traces=('traces', 'sum'),
+                                                         peak_memory=('peak_memory', 'max'))
+
+        summary['traces_per_second'] = summary.traces / summary.seconds
+        summary['bytes_per_second'] = summary.bytes / summary.seconds
+
+        return summary
+
+    # ----- Dunder methods ----- #
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __len__(self):
+        return len(self.records)
@@ -0,0 +1,205 @@
+""" philoseismos: with passion for the seismic method.
+
+This file defines functions that re-sort the traces of a SEG-Y file
+by the values of Trace Headers, without loading the whole file.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+from philoseismos.segy import gfunc
+from philoseismos.segy.components import Geometry
+from philoseismos.segy.tools.constants import data_block_size, resort_pbar_params
+from philoseismos.segy.tools.file_info import SegyFileInfo
+
+import itertools
+import os
+import tempfile
+
+import numpy as np
+from tqdm import tqdm
+
+
+def resort(in_file, out_file, keys=('CDP', 'OFFSET'), method='gather', buffer_size=data_block_size, fan_in=64,
+           temp_dir=None, progress=False):
+    """ Writes the traces of a file into a new file, sorted by the given Trace Headers.
+
+    Only the key headers are loaded into memory and sorted; the traces are copied
+    byte for byte, with at most buffer_size bytes of traces in memory at a time.
+    The sort is stable, so traces with equal keys keep their order.
+
+    Two methods are available:
+
+    'gather' writes the new file in order and reads the traces for each batch
+    from wherever they are in the input file. This is the fastest method when
+    the input file is on a storage with fast random access (or in the page cache).
+
+    'merge' is an external merge sort: the input file is read sequentially and
+    split into sorted runs in temporary files, which are then merged (in several
+    passes if there are more than fan_in runs). All reads and writes are sequential,
+    which suits files much larger than memory on spinning disks or network storage.
+
+    Parameters
+    ----------
+    in_file : str
+        Path to the SEG-Y file to re-sort.
+    out_file : str
+        Path to the file to write. Has to be different from in_file.
+    keys : iterable
+        Names of the Trace Headers to sort by, the first one being the primary key.
+    method : str
+        Either 'gather' or 'merge'.
+    buffer_size : int
+        Maximum size of the traces held in memory at a time, in bytes.
+    fan_in : int
+        Maximum number of runs merged at once ('merge' method only).
+    temp_dir : str
+        Directory for the temporary files of the 'merge' method. Defaults to the system one.
+    progress : bool
+        Toggle the progress bar (disabled by default).
+
+    """
+
+    if method not in ('gather', 'merge'):
+        raise ValueError(f'Unknown method {method!r}: expected "gather" or "merge"!')
+
+    # the output file is truncated before the traces are read from the input file
+    if os.path.exists(out_file) and os.path.samefile(in_file, out_file):
+        raise ValueError('The output file has to be different from the input file!')
+
+    info = SegyFileInfo.from_file(in_file)
+    nt, trace_size = info.number_of_traces, info.trace_size
+    keys = list(keys)
+
+    g = Geometry()
+    g._load_with_parameters(in_file, info.endian, info.trace_length, info.sample_size, nt, columns=keys)
+
+    # positions of the traces of the input file, in the new order
+    order = np.lexsort([g.table[key].values for key in reversed(keys)])
+
+    # traces are copied as raw records
+    record = np.dtype((np.void, trace_size))
+    traces_per_batch = max(1, buffer_size // trace_size)
+
+    with open(out_file, 'bw') as out, tqdm(total=nt, disable=not progress, **resort_pbar_params) as pbar:
+        out.write(info.tfh_bytes)
+        out.write(info.bfh_bytes)
+
+        if method == 'gather':
+            _gather(in_file, out, order, record, traces_per_batch, pbar)
+        else:
+            _external_merge(in_file, out, order, record, traces_per_batch, fan_in, temp_dir, pbar)
+
+    SegyFileInfo.invalidate(out_file)
+
+
+def _gather(in_file, out, order, record, traces_per_batch, pbar):
+    """ Writes the traces in the given order, reading each batch of them from the input file. """
+
+    with open(in_file, 'br') as f:
+        for start in range(0, order.size, traces_per_batch):
+            sources = order[start:start + traces_per_batch]
+
+            # traces of the batch are read in the order they are in the file
+            positions = np.argsort(sources)
+            batch = np.empty(sources.size, dtype=record)
+
+            for position, first, count in gfunc._consecutive_runs(sources[positions]):
+                f.seek(3600 + first * record.itemsize)
+                raw = np.frombuffer(f.read(count * record.itemsize), dtype=record)
+                batch[positions[position:position + count]] = raw
+
+            batch.tofile(out)
+            pbar.update(sources.size)
+
+
+def _external_merge(in_file, out, order, record, traces_per_batch, fan_in, temp_dir, pbar):
+    """ Writes the traces in the given order by merging sorted runs of the input file. """
+
+    nt = order.size
+
+    # position of each trace of the input file in the new order
+    rank = np.empty(nt, dtype=np.int64)
+    rank[order] = np.arange(nt)
+
+    with tempfile.TemporaryDirectory(dir=temp_dir) as directory:
+        paths = (os.path.join(directory, f'run{i}') for i in itertools.count())
+
+        # first pass: sorted runs of consecutive traces
+        runs = []
+        with open(in_file, 'br') as f:
+            f.seek(3600)
+
+            for start in range(0, nt, traces_per_batch):
+                count = min(traces_per_batch, nt - start)
+                traces = np.frombuffer(f.read(count * record.itemsize), dtype=record)
+
+                ranks = rank[start:start + count]
+                positions = np.argsort(ranks)
+
+                path = next(paths)
+                traces[positions].tofile(path)
+                runs.append((path, ranks[positions]))
+
+        # intermediate passes: merge groups of runs into longer runs
+        while len(runs) > fan_in:
+            merged = []
+
+            for i in range(0, len(runs), fan_in):
+                path = next(paths)
+                with open(path, 'bw') as f:
+                    merged.append((path, _merge_runs(runs[i:i + fan_in], f, record, traces_per_batch)))
+
+            runs = merged
+
+        # last pass: merge into the output file
+        _merge_runs(runs, out, record, traces_per_batch, pbar)
+
+
+def _merge_runs(runs, out, record, traces_per_batch, pbar=None):
+    """ Merges sorted runs into an opened file, and removes the run files.
+
+    Parameters
+    ----------
+    runs : list
+        Tuples (path to the run file, ranks of the traces in the run in increasing order).
+    out : file
+        Opened file to write the merged traces into.
+
+    Returns
+    -------
+    ranks : numpy.ndarray
+        Ranks of the merged traces, in increasing order.
+
+    """
+
+    ranks = np.concatenate([run_ranks for _, run_ranks in runs])
+    sources = np.repeat(np.arange(len(runs)), [run_ranks.size for _, run_ranks in runs])
+
+    # the run of each merged trace; since the runs are sorted, their traces
+    # are consumed from the start of each run file sequentially
+    merged = np.argsort(ranks, kind='stable')
+    sources = sources[merged]
+
+    files = [open(path, 'br') for path, _ in runs]
+
+    try:
+        for start in range(0, sources.size, traces_per_batch):
+            batch_sources = sources[start:start + traces_per_batch]
+            batch = np.empty(batch_sources.size, dtype=record)
+
+            for run in np.unique(batch_sources):
+                mask = batch_sources == run
+                batch[mask] = np.frombuffer(files[run].read(int(mask.sum()) * record.itemsize), dtype=record)
+
+            batch.tofile(out)
+
+            if pbar is not None:
+                pbar.update(batch.size)
+    finally:
+        for f in files:
+            f.close()
+
+        for path, _ in runs:
+            os.remove(path)
+
+    return ranks[merged]
@@ -0,0 +1,69 @@
+""" philoseismos: with passion for the seismic method.
+
+This file defines functions that scan the headers of many SEG-Y files
+concurrently, using asyncio.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+from philoseismos.segy.components import BinaryFileHeader, Geometry
+from philoseismos.segy.tools.file_info import SegyFileInfo
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+async def scan_headers(paths, concurrency=64, columns=('FFID', 'CHAN', 'CDP', 'OFFSET')):
+    """ Reads the Binary File Headers and the selected Trace Headers of many files.
+
+    Reading the headers of a file takes a few small blocking reads, so the files are
+    scanned by a pool of threads, with up to concurrency files being read at the
+    same time. On slow shared storage the throughput is then limited by the latency
+    of the storage, not by the time spent decoding the headers.
+
+    To use it from regular code, run it in an event loop:
+
+        results = asyncio.run(scan_headers(paths))
+
+    Parameters
+    ----------
+    paths : iterable
+        Paths to the SEG-Y files.
+    concurrency : int
+        Maximum number of files that are read at the same time.
+    columns : iterable
+        Names of the Trace Headers to read, same as in the Geometry table.
+
+    Returns
+    -------
+    results : list
+        Tuples (BinaryFileHeader, headers), one for each file, in the order of paths.
+        Headers is a dictionary {header name: numpy array with a value for each trace}.
+
+    """
+
+    loop = asyncio.get_event_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    columns = list(columns)
+
+    async def scan(path):
+        async with semaphore:
+            return await loop.run_in_executor(pool, _scan_file, path, columns)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return await asyncio.gather(*(scan(path) for path in paths))
+
+
+def _scan_file(path, columns):
+    """ Returns the Binary File Header and the selected Trace Headers of one file. """
+
+    info = SegyFileInfo.from_file(path)
+
+    bfh = BinaryFileHeader()
+    bfh.load_from_bytes(info.bfh_bytes)
+
+    g = Geometry()
+    g._load_with_parameters(path, info.endian, info.trace_length, info.sample_size, info.number_of_traces,
+                            columns=columns)
+
+    return bfh, {column: g.table[column].values for column in columns}
@@ -6,6 +6,7 @@ This file contains tests for loading SEG-Y files with the Segy object.
 e-mail: dubrovin.io@icloud.com """
 
 import pytest
+import numpy as np
 
 from philoseismos import Segy
 
@@ -49,3 +50,18 @@ def temporary_segy(tmp_path_factory):
     sgy.save_file(path)
 
     return path
+
+
+@pytest.fixture(scope='package')
+def ramp_segy(tmp_path_factory):
+    """ Returns a path to a SEG-Y file where each sample holds 1000 * trace index + sample index. """
+
+    path = tmp_path_factory.mktemp('sgys') / 'ramp.sgy'
+
+    sgy = Segy.empty(shape=(30, 100), sample_interval=2000)
+    sgy.DM.matrix[:] = np.arange(30)[:, np.newaxis] * 1000 + np.arange(100)
+    sgy.G.table.loc[:, 'FFID'] = np.repeat([1, 2, 3], 10)
+    sgy.G.table.loc[:, 'CDP'] = np.arange(30) % 7
+    sgy.save_file(path)
+
+    return path
@@ -0,0 +1,38 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains tests for caching Segy objects.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import numpy as np
+
+from philoseismos import Segy
+
+
+def test_cache_round_trip(temporary_segy, tmp_path):
+    """ Test that a Segy is the same after saving it into cache and loading it back. """
+
+    sgy = Segy(temporary_segy)
+    sgy.to_cache(tmp_path / 'cache')
+
+    cached = Segy.from_cache(tmp_path / 'cache')
+
+    assert isinstance(cached.DM.matrix, np.memmap)
+    assert np.all(cached.DM.matrix == sgy.DM.matrix)
+    assert np.all(cached.DM.t == sgy.DM.t)
+    assert cached.G.table.equals(sgy.G.table)
+    assert cached.TFH.text == sgy.TFH.text
+    assert cached.BFH.table.equals(sgy.BFH.table)
+
+
+def test_cache_converts_back_to_segy(ramp_segy, tmp_path):
+    """ Test that a cached Segy is saved into the same SEG-Y file as the original. """
+
+    sgy = Segy(ramp_segy)
+    sgy.to_cache(tmp_path / 'cache')
+    sgy.save_file(tmp_path / 'original.sgy')
+
+    Segy.from_cache(tmp_path / 'cache').save_file(tmp_path / 'cached.sgy')
+
+    assert (tmp_path / 'cached.sgy').read_bytes() == (tmp_path / 'original.sgy').read_bytes()
@@ -5,3 +5,48 @@ This file contains tests for the DataMatrix object.
 @author: Ivan Dubrovin
 e-mail: dubrovin.io@icloud.com """
 
+import shutil
+
+import pytest
+import numpy as np
+
+from philoseismos import Segy
+from philoseismos.segy.components import DataMatrix
+
+
+def test_replace_subset_in_file(ramp_segy, tmp_path):
+    """ Test that only the given traces and samples are replaced in the file. """
+
+    path = tmp_path / 'ramp.sgy'
+    shutil.copy(ramp_segy, path)
+    original = Segy(ramp_segy)
+
+    dm = DataMatrix()
+    dm.matrix = -np.ones((2, 5), dtype=np.float32)
+    dm.replace_in_file(path, indices=[3, 17], t0=10, t1=20)
+
+    expected = original.DM.matrix.copy()
+    expected[[3, 17], 5:10] = -1
+
+    replaced = Segy(path)
+    assert np.all(replaced.DM.matrix == expected)
+    assert replaced.G.table.equals(original.G.table)
+
+    # a full matrix is accepted as well, only the given traces are taken from it
+    full = Segy(path, mmap=True).DM
+    full.matrix = np.zeros((30, 100), dtype='>f4')
+    full.replace_in_file(path, indices=slice(0, 2))
+
+    assert np.all(Segy(path).DM.matrix[:2] == 0)
+    assert np.all(Segy(path).DM.matrix[2:] == expected[2:])
+
+    with pytest.raises(ValueError):
+        dm.replace_in_file(path, indices=[1, 2, 3])
+
+    # types that are cast safely are accepted, others are not
+    dm.matrix = -np.ones((2, 5), dtype=np.int16)
+    dm.replace_in_file(path, indices=[3, 17], t0=10, t1=20)
+
+    dm.matrix = -np.ones((2, 5), dtype=np.float64)
+    with pytest.raises(ValueError):
+        dm.replace_in_file(path, indices=[3, 17], t0=10, t1=20)
@@ -0,0 +1,139 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains tests for the Geometry object.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import shutil
+
+import numpy as np
+import pytest
+
+from philoseismos import Segy
+from philoseismos.segy.components import Geometry
+
+
+def test_write_columns_only_changes_given_columns(temporary_segy, tmp_path):
+    """ Test that only the given headers are written into the file. """
+
+    path = tmp_path / 'copy.sgy'
+    shutil.copy(temporary_segy, path)
+    original = path.read_bytes()
+
+    g = Geometry(path)
+    g.table.loc[:, 'CDP'] = range(1000, 1048)
+    g.table.loc[:, 'OFFSET'] = 2.5
+    g.table.loc[:, 'FFID'] = 1  # changed, but not written
+    g.write_columns(path, ['CDP', 'OFFSET'])
+
+    changed = Geometry(path)
+    assert np.all(changed.table.CDP == range(1000, 1048))
+    assert np.all(changed.table.OFFSET == 2.5)
+    assert np.all(changed.table.FFID == 1984)
+
+    # only the 4 bytes of CDP and the 4 bytes of OFFSET in each header differ
+    difference = np.frombuffer(path.read_bytes(), np.uint8) != np.frombuffer(original, np.uint8)
+    assert 0 < difference.sum() <= 48 * 8
+    assert np.all(Segy(path).DM.matrix == 12)
+
+
+def test_saving_does_not_change_the_geometry(tmp_path):
+    """ Test that coordinates are scaled into the file without changing the table, and without truncation. """
+
+    sgy = Segy.empty(shape=(4, 16))
+    sgy.G.table.loc[:, 'COORDSC'] = [-1000, -100, 10, 0]
+    sgy.G.table.loc[:, 'SOU_X'] = [61.061, 0.29, 120, 7]
+    sgy.G.table.loc[:, 'OFFSET'] = [-0.007, 1.01, -30, 0]
+    table = sgy.G.table.copy()
+
+    sgy.save_file(tmp_path / 'scaled.sgy')
+    assert sgy.G.table.equals(table)
+
+    loaded = Geometry(tmp_path / 'scaled.sgy')
+    assert np.all(loaded.table.SOU_X == [61.061, 0.29, 120, 7])
+    assert np.all(loaded.table.OFFSET == [-0.007, 1.01, -30, 0])
+    assert np.all(loaded.table.COORDSC == [-1000, -100, 10, 1])
+
+
+def test_headers_keep_their_data_types(temporary_segy):
+    """ Test that each header is loaded with the data type of its field. """
+
+    g = Geometry(temporary_segy)
+
+    assert g.table.TRC_TYPE.dtype == np.int16
+    assert g.table.FFID.dtype == np.int32
+
+
+def test_loading_selected_columns(temporary_segy):
+    """ Test that only the requested headers are loaded, with coordinates still scaled. """
+
+    full = Geometry(temporary_segy)
+    g = Geometry(temporary_segy, columns=['FFID', 'SOU_X'])
+
+    # the coordinate scalar is kept along with the coordinates
+    assert list(g.table.columns) == ['FFID', 'SOU_X', 'COORDSC']
+    assert np.all(g.table.SOU_X == full.table.SOU_X)
+    assert list(Segy(temporary_segy, columns=['CDP']).G.table.columns) == ['CDP']
+
+
+def test_writing_selected_columns(temporary_segy, tmp_path):
+    """ Test that coordinates loaded without other headers are written back with their scalar. """
+
+    path = tmp_path / 'copy.sgy'
+    shutil.copy(temporary_segy, path)
+    original = path.read_bytes()
+
+    g = Geometry(path, columns=['SOU_X'])
+    g.write_columns(path, ['SOU_X'])
+    assert path.read_bytes() == original
+
+    g.table.loc[:, 'SOU_X'] = 1.5
+    g.write_columns(path, ['SOU_X'])
+    assert np.all(Geometry(path).table.SOU_X == 1.5)
+
+    g.table.drop(columns='COORDSC', inplace=True)
+    with pytest.raises(ValueError, match='COORDSC'):
+        g.write_columns(path, ['SOU_X'])
+
+
+def test_writing_unknown_columns(temporary_segy, tmp_path):
+    """ Test that misspelled or not loaded headers are not silently skipped. """
+
+    path = tmp_path / 'copy.sgy'
+    shutil.copy(temporary_segy, path)
+
+    g = Geometry(path, columns=['CDP'])
+
+    with pytest.raises(KeyError, match='CPD'):
+        g.write_columns(path, ['CPD'])
+    with pytest.raises(KeyError, match='FFID'):
+        g.write_columns(path, ['FFID'])
+
+    # the whole table is written, whatever columns it has
+    g.table.loc[:, 'CDP'] = 7
+    g.replace_in_file(path)
+    assert np.all(Geometry(path).table.CDP == 7)
+
+
+def test_values_that_do_not_fit_are_not_written(tmp_path):
+    """ Test that headers with values out of the range of their fields are not wrapped around. """
+
+    sgy = Segy.empty(shape=(4, 16))
+    sgy.G.table.loc[:, 'DT'] = 40000
+
+    with pytest.raises(ValueError, match='DT'):
+        sgy.save_file(tmp_path / 'dt.sgy')
+
+    sgy = Segy.empty(shape=(4, 16))
+    sgy.G.table.loc[:, 'COORDSC'] = -1000
+    sgy.G.table.loc[:, 'OFFSET'] = 3e6
+
+    with pytest.raises(ValueError, match='OFFSET'):
+        sgy.save_file(tmp_path / 'offset.sgy')
+
+    sgy = Segy.empty(shape=(4, 16))
+    sgy.G.table['CDP'] = [1, 2, np.nan, 4]
+
+    with pytest.raises(ValueError, match='CDP'):
+        sgy.save_file(tmp_path / 'cdp.sgy')
@@ -0,0 +1,84 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains tests for the HeaderIndex object.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import os
+import shutil
+
+import numpy as np
+
+from philoseismos import Segy
+from philoseismos.segy.components import HeaderIndex
+
+
+def test_header_index_sidecar(temporary_segy, tmp_path):
+    """ Test that the index is stored next to the file, reused, and rebuilt when the file changes. """
+
+    path = tmp_path / 'copy.sgy'
+    shutil.copy(temporary_segy, path)
+
+    index = HeaderIndex(path)
+    sidecar = HeaderIndex.sidecar_path(path)
+
+    assert os.path.exists(sidecar)
+    assert np.all(index.select({'CHAN': 12}) == [11])
+    assert np.all(index.table['BYTE'].values[:2] == [3600, 3600 + 240 + 512 * 4])
+
+    # a valid sidecar is loaded instead of being rebuilt
+    assert HeaderIndex(path).table.equals(index.table)
+
+    # changing the file invalidates the index
+    sgy = Segy(path)
+    sgy.G.table.loc[:, 'FFID'] = np.repeat([1, 2], 24)
+    sgy.save_file(path)
+    os.utime(path, ns=(index.mtime + 10 ** 9, index.mtime + 10 ** 9))
+
+    assert not index.is_valid
+    assert np.all(HeaderIndex(path).select({'FFID': 2}) == np.arange(24, 48))
+
+
+def test_segy_from_fixed_headers(temporary_segy, tmp_path):
+    """ Test that only the selected traces are loaded using the index. """
+
+    path = tmp_path / 'copy.sgy'
+    shutil.copy(temporary_segy, path)
+
+    sgy = Segy.from_fixed_headers(path, {'FFID': 1984, 'CHAN': 5})
+
+    assert sgy.DM.matrix.shape == (1, 512)
+    assert np.all(sgy.DM.matrix == 12)
+    assert sgy.G.table.loc[0, 'SOU_X'] == 54
+    assert sgy.BFH['Traces / Ensemble'] == 1
+
+
+def test_header_index_without_writable_sidecar(temporary_segy, tmp_path):
+    """ Test that the index is stored in a sidecar directory, and kept in memory if it can not be stored. """
+
+    path = tmp_path / 'copy.sgy'
+    shutil.copy(temporary_segy, path)
+    sidecars = tmp_path / 'sidecars'
+    sidecars.mkdir()
+
+    index = HeaderIndex(path, sidecar_dir=sidecars)
+
+    assert os.path.exists(HeaderIndex.sidecar_path(path, sidecars))
+    assert not os.path.exists(HeaderIndex.sidecar_path(path))
+    assert HeaderIndex(path, sidecar_dir=sidecars).table.equals(index.table)
+
+    # a file with the same name from another directory has its own sidecar
+    other = tmp_path / 'other' / 'copy.sgy'
+    other.parent.mkdir()
+    shutil.copy(temporary_segy, other)
+    HeaderIndex(other, sidecar_dir=sidecars)
+
+    assert HeaderIndex.sidecar_path(other, sidecars) != HeaderIndex.sidecar_path(path, sidecars)
+    assert len(os.listdir(sidecars)) == 2
+
+    # the sidecar can not be written into a missing directory
+    index = HeaderIndex(path, sidecar_dir=tmp_path / 'missing')
+
+    assert np.all(index.select({'CHAN': 12}) == [11])
+    assert Segy.from_fixed_headers(path, {'CHAN': 5}, sidecar_dir=tmp_path / 'missing').DM.matrix.shape == (1, 512)
@@ -0,0 +1,53 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains tests for the SegyDataset object.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import pytest
+import numpy as np
+
+from philoseismos import Segy
+from philoseismos.segy.components import SegyDataset
+
+
+@pytest.fixture(scope='module')
+def shot_directory(tmp_path_factory):
+    """ Returns a path to a directory with three shot files, 10 traces each. """
+
+    path = tmp_path_factory.mktemp('shots')
+
+    for ffid in range(1, 4):
+        sgy = Segy.empty(shape=(10, 50), sample_interval=1000)
+        sgy.DM.matrix[:] = ffid * 100 + np.arange(10)[:, np.newaxis]
+        sgy.G.table.loc[:, 'FFID'] = ffid
+        sgy.save_file(path / f'shot_{ffid}.sgy')
+
+    return path
+
+
+def test_dataset_merges_geometries(shot_directory):
+    """ Test that the geometries of all the files are merged into one table. """
+
+    dataset = SegyDataset(shot_directory)
+
+    assert len(dataset) == 30
+    assert [f[-10:] for f in dataset.files] == ['shot_1.sgy', 'shot_2.sgy', 'shot_3.sgy']
+    assert list(dataset.table.FFID.unique()) == [1, 2, 3]
+    assert dataset.table.loc[25, 'FILE'] == 2
+    assert dataset.table.loc[25, 'TRACE'] == 5
+    assert len(SegyDataset(str(shot_directory / 'shot_[12].sgy'))) == 20
+
+
+def test_dataset_reads_traces_from_files(shot_directory):
+    """ Test that traces are fetched from the files that own them. """
+
+    dataset = SegyDataset(shot_directory)
+
+    matrix = dataset.read_traces([25, 3, 14])
+    assert np.all(matrix[:, 0] == [305, 103, 204])
+
+    sgy = dataset.extract_by_fixed_headers({'FFID': (2, 3), 'CHAN': 1})
+    assert np.all(sgy.DM.matrix[:, 0] == [200, 300])
+    assert list(sgy.G.table.FFID) == [2, 3]
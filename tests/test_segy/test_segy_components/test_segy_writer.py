@@ -0,0 +1,56 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains tests for the SegyWriter object.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from philoseismos import Segy
+from philoseismos.segy import SegyWriter, gfunc
+
+
+def test_writer_appends_blocks(tmp_path):
+    """ Test that the blocks are written one after another and the number of traces is set on close. """
+
+    path = tmp_path / 'written.sgy'
+    matrix = np.arange(10 * 64, dtype=np.float32).reshape(10, 64)
+
+    with SegyWriter(path, sample_interval=2000, ns=64, sample_format=1, endian='<') as writer:
+        writer.write(matrix[:4], headers={'FFID': 1, 'OFFSET': np.arange(4) * 10})
+        writer.write(matrix[4], headers={'FFID': 2, 'OFFSET': 0})
+        writer.write(matrix[5:], headers=pd.DataFrame({'FFID': [3] * 5}))
+
+    sgy = Segy(path)
+
+    assert sgy.BFH['# Traces'] == 10
+    assert gfunc.get_endianness(path) == '<'
+    assert np.all(sgy.DM.matrix == matrix)
+    assert np.all(sgy.G.table.FFID == [1] * 4 + [2] + [3] * 5)
+    assert np.all(sgy.G.table.OFFSET == [0, 10, 20, 30] + [0] * 6)
+    assert np.all(sgy.G.table.TRACENO == np.arange(1, 11))
+    assert np.all(sgy.G.table.DT == 2000)
+    assert np.all(sgy.G.table.NUMSMP == 64)
+
+
+def test_writer_checks_the_number_of_samples(tmp_path):
+    """ Test that traces of a wrong length are rejected. """
+
+    with SegyWriter(tmp_path / 'written.sgy', sample_interval=1000, ns=32) as writer:
+        with pytest.raises(ValueError):
+            writer.write(np.zeros((2, 33)))
+
+
+def test_empty_like(temporary_segy):
+    """ Test that empty_like takes the shape and the sample interval from a file or a Segy. """
+
+    original = Segy(temporary_segy)
+
+    for source in (original, str(temporary_segy)):
+        empty = Segy.empty_like(source)
+        assert empty.DM.matrix.shape == original.DM.matrix.shape
+        assert np.all(empty.DM.t == original.DM.t)
+        assert np.all(empty.G.table.TRACENO == np.arange(1, 49))
@@ -0,0 +1,55 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains tests for the TraceArchive object.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import numpy as np
+import pytest
+
+from philoseismos import Segy
+from philoseismos.segy import TraceArchive
+
+
+@pytest.mark.parametrize('codec, shuffle', [('zlib', True), ('lzma', False), ('none', True)])
+def test_round_trip_is_identical(ramp_segy, tmp_path, codec, shuffle):
+    """ Test that a SEG-Y file restored from the archive is identical to the original one. """
+
+    archive = TraceArchive.from_segy(ramp_segy, tmp_path / 'ramp.arc', chunk_size=7, codec=codec, shuffle=shuffle)
+    archive.to_segy(tmp_path / 'restored.sgy')
+
+    assert len(archive) == 30
+    assert (tmp_path / 'restored.sgy').read_bytes() == ramp_segy.read_bytes()
+
+
+def test_reading_from_the_archive(ramp_segy, tmp_path):
+    """ Test that single traces and the Geometry are read from the archive. """
+
+    original = Segy(ramp_segy)
+    archive = TraceArchive.from_segy(ramp_segy, tmp_path / 'ramp.arc', chunk_size=8)
+
+    indices = [29, 3, 17, 3]
+    assert np.all(archive.read_traces(indices) == original.DM.matrix[indices])
+    assert np.all(archive.G.table.values == original.G.table.values)
+
+    loaded = TraceArchive(tmp_path / 'ramp.arc').load()
+    assert np.all(loaded.DM.matrix == original.DM.matrix)
+    assert loaded.BFH['Sample Interval'] == 2000
+
+
+def test_archive_from_segy_object(tmp_path):
+    """ Test that a Segy object with IBM samples is archived and read back. """
+
+    sgy = Segy.empty(shape=(5, 40), sample_interval=1000)
+    sgy.BFH['Sample Format'] = 1
+    sgy.DM.matrix[:] = np.arange(200).reshape(5, 40) - 99.5
+    sgy.G.table['FFID'] = [4, 4, 5, 5, 5]
+
+    archive = TraceArchive.from_segy(sgy, tmp_path / 'ibm.arc', chunk_size=2, codec='bz2')
+
+    assert np.all(archive.read_traces(slice(None)) == sgy.DM.matrix)
+    assert np.all(archive.G.table.FFID == [4, 4, 5, 5, 5])
+
+    archive.to_segy(tmp_path / 'ibm.sgy')
+    assert np.all(Segy(tmp_path / 'ibm.sgy').DM.matrix == sgy.DM.matrix)
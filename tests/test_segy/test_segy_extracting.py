@@ -0,0 +1,41 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains tests for extracting subsets of traces with the Segy object.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import numpy as np
+
+from philoseismos import Segy
+
+
+def test_extract_by_fixed_headers_with_conditions(ramp_segy):
+    """ Test extraction with equality, range and membership conditions. """
+
+    sgy = Segy(ramp_segy)
+
+    by_value = sgy.extract_by_fixed_headers({'FFID': 2})
+    assert np.all(by_value.DM.matrix == sgy.DM.matrix[10:20])
+    assert by_value.BFH['Traces / Ensemble'] == 10
+    assert sgy.BFH['Traces / Ensemble'] == 30
+
+    combined = sgy.extract_by_fixed_headers({'FFID': (2, None), 'CDP': {0, 6}})
+    assert list(combined.G.table.CDP) == [6, 0, 6, 0, 6, 0]
+    assert np.all(combined.DM.matrix == sgy.DM.matrix[[13, 14, 20, 21, 27, 28]])
+
+
+def test_groupby(ramp_segy):
+    """ Test splitting a Segy into ensembles. """
+
+    sgy = Segy(ramp_segy)
+
+    ensembles = sgy.groupby('FFID')
+    assert list(ensembles) == [1, 2, 3]
+    assert np.all(ensembles[3].DM.matrix == sgy.DM.matrix[20:])
+    assert ensembles[1].TFH is sgy.TFH
+
+    ensembles = sgy.groupby(['CDP', 'FFID'])
+    assert list(ensembles)[:3] == [(0, 1), (0, 2), (0, 3)]
+    assert np.all(ensembles[(6, 2)].DM.matrix == sgy.DM.matrix[[13]])
+    assert sum(e.DM.matrix.shape[0] for e in ensembles.values()) == 30
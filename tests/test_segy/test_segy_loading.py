@@ -5,8 +5,10 @@ This file contains tests for loading SEG-Y files with the Segy object.
 @author: Ivan Dubrovin
 e-mail: dubrovin.io@icloud.com """
 
+import pytest
 import numpy as np
 
+from philoseismos import Segy
 from philoseismos.segy.components import TextualFileHeader, BinaryFileHeader, DataMatrix, Geometry
 
 
@@ -63,3 +65,86 @@ def test_geometry_loads_correctly(temporary_segy):
     assert g.table.loc[0, 'REC_X'] == 100
     assert g.table.loc[11, 'REC_X'] == 111
     assert g.table.loc[47, 'REC_X'] == 147
+
+
+def test_data_matrix_loads_correctly_with_mmap(temporary_segy):
+    """ Test memory mapped loading of the Data Matrix. """
+
+    dm = DataMatrix()
+    dm.load_from_file(temporary_segy, mmap=True)
+
+    assert isinstance(dm.matrix.base, np.memmap)
+    assert dm.matrix.shape == (48, 512)
+    assert np.all(dm.matrix == 12)
+
+
+def test_segy_loads_the_same_as_components(temporary_segy):
+    """ Test that loading the whole file in one pass gives the same result as loading components. """
+
+    dm = DataMatrix(temporary_segy)
+    g = Geometry(temporary_segy)
+
+    for mmap in (False, True):
+        sgy = Segy(temporary_segy, mmap=mmap)
+
+        assert sgy.TFH.text == 'This is a test Textual File Header! :)'.ljust(3200)
+        assert sgy.BFH['Job ID'] == 666
+        assert np.all(sgy.DM.matrix == dm.matrix)
+        assert np.all(sgy.DM.t == dm.t)
+        assert sgy.G.table.equals(g.table)
+
+
+def test_segy_loads_components_lazily(temporary_segy):
+    """ Test that in lazy mode the Data Matrix and the Geometry are loaded on first access. """
+
+    sgy = Segy(temporary_segy, lazy=True)
+
+    assert sgy.BFH['Job ID'] == 666
+    assert sgy._DM.matrix is None
+    assert sgy._G.table is None
+
+    assert sgy.G.table.loc[11, 'CHAN'] == 12
+    assert sgy._DM.matrix is None
+
+    assert np.all(sgy.DM.matrix == 12)
+    assert sgy.DM.dt == 1
+
+
+def test_segy_lazy_loading_is_retried_after_failure(temporary_segy, tmp_path):
+    """ Test that a component that failed to load is not treated as loaded. """
+
+    path = tmp_path / 'truncated.sgy'
+    path.write_bytes(temporary_segy.read_bytes())
+
+    sgy = Segy(path, lazy=True)
+
+    with open(path, 'r+b') as f:
+        f.truncate(3600 + 240)
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            sgy.G
+        with pytest.raises(ValueError):
+            sgy.DM
+
+    path.write_bytes(temporary_segy.read_bytes())
+
+    assert sgy.G.table.loc[11, 'CHAN'] == 12
+    assert np.all(sgy.DM.matrix == 12)
+
+
+def test_segy_loads_the_same_with_workers(ramp_segy, tmp_path):
+    """ Test that loading and saving with several threads gives the same result. """
+
+    sgy = Segy(ramp_segy)
+
+    parallel = Segy(ramp_segy, workers=4)
+    assert np.all(parallel.DM.matrix == sgy.DM.matrix)
+    assert parallel.G.table.equals(sgy.G.table)
+
+    dm = DataMatrix(ramp_segy, workers=3)
+    assert np.all(dm.matrix == sgy.DM.matrix)
+
+    sgy.save_file(tmp_path / 'parallel.sgy', workers=4)
+    sgy.save_file(tmp_path / 'serial.sgy')
+    assert (tmp_path / 'parallel.sgy').read_bytes() == (tmp_path / 'serial.sgy').read_bytes()
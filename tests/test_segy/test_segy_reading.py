@@ -0,0 +1,63 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains tests for reading parts of SEG-Y files with the Segy object.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import pytest
+import numpy as np
+
+from philoseismos import Segy
+
+
+def test_read_traces_by_indices(ramp_segy):
+    """ Test reading of separate, adjacent, repeated and negative trace indices. """
+
+    sgy = Segy(ramp_segy)
+    lazy = Segy(ramp_segy, lazy=True)
+
+    indices = [5, 3, 4, 5, 29, -1, 0]
+    assert np.all(lazy.read_traces(indices) == sgy.DM.matrix[indices])
+    assert np.all(lazy.read_traces(slice(2, 20, 3)) == sgy.DM.matrix[2:20:3])
+    assert np.all(lazy.read_traces(7) == sgy.DM.matrix[[7]])
+
+    with pytest.raises(IndexError):
+        lazy.read_traces([30])
+
+
+def test_read_traces_by_mask(ramp_segy):
+    """ Test that a boolean mask selects the traces, instead of being taken as indices 0 and 1. """
+
+    sgy = Segy(ramp_segy)
+    mask = sgy.G.table.TRACENO.values % 3 == 0
+
+    assert np.all(sgy.read_traces(mask) == sgy.DM.matrix[mask])
+    assert np.all(sgy.read_headers(mask).index == np.flatnonzero(mask))
+
+    with pytest.raises(IndexError):
+        sgy.read_traces(mask[:-1])
+    with pytest.raises(IndexError):
+        sgy.read_traces([1.5])
+
+
+def test_read_traces_in_a_time_window(ramp_segy):
+    """ Test that only the samples in the time window are returned. """
+
+    sgy = Segy(ramp_segy, lazy=True)
+    window = sgy.read_traces([1, 2, 10], t0=20, t1=50)
+
+    # sample interval is 2 ms, so samples from 10 to 24 are in the window
+    assert window.shape == (3, 15)
+    assert np.all(window[0] == 1000 + np.arange(10, 25))
+    assert np.all(window[2] == 10000 + np.arange(10, 25))
+
+
+def test_read_headers(ramp_segy):
+    """ Test reading of only the given Trace Headers. """
+
+    sgy = Segy(ramp_segy)
+    headers = Segy(ramp_segy, lazy=True).read_headers([12, 11, 25])
+
+    assert list(headers.index) == [12, 11, 25]
+    assert headers.equals(sgy.G.table.loc[[12, 11, 25]])
@@ -6,8 +6,11 @@ This file contains tests for saving SEG-Y files with the Segy object.
 e-mail: dubrovin.io@icloud.com """
 
 import struct
+import pytest
 import numpy as np
 
+from philoseismos import Segy
+
 
 # TODO: extend test to proper go through the file byte by byte
 
@@ -87,3 +90,87 @@ def test_data_matrix_is_written_correctly(temporary_segy):
             # go to the start of the trace
             s.seek(3840 + i * (240 + 512 * 4))
             assert s.read(512 * 4) == what_trace_bytes_should_be
+
+
+def test_little_endian_integer_file_round_trip(tmp_path):
+    """ Test that a little endian file with 2-byte integer samples is saved and loaded back. """
+
+    sgy = Segy.empty(shape=(10, 32), sample_interval=250)
+    sgy.BFH['Sample Format'] = 3
+    sgy.DM.matrix = np.arange(-160, 160, dtype=np.int16).reshape(10, 32)
+    sgy.G.table.loc[:, 'CDP'] = range(100, 110)
+    sgy.save_file(tmp_path / 'le.sgy', endian='<')
+
+    loaded = Segy(tmp_path / 'le.sgy')
+
+    assert loaded.BFH.endian == '<'
+    assert loaded.DM.matrix.dtype == np.int16
+    assert np.all(loaded.DM.matrix == sgy.DM.matrix)
+    assert np.all(loaded.G.table.CDP == range(100, 110))
+    assert np.all(loaded.G.table.NUMSMP == 32)
+
+
+def test_float64_round_trip(tmp_path):
+    """ Test that 8-byte IEEE floating point samples (format 6) are saved and loaded back. """
+
+    sgy = Segy.empty(shape=(6, 32), sample_interval=500)
+    sgy.BFH['Sample Format'] = 6
+    sgy.DM.matrix = np.random.default_rng(1).standard_normal((6, 32))
+    sgy.save_file(tmp_path / 'float64.sgy')
+
+    loaded = Segy(tmp_path / 'float64.sgy')
+
+    assert (tmp_path / 'float64.sgy').stat().st_size == 3600 + 6 * (240 + 32 * 8)
+    assert loaded.DM.matrix.dtype == np.float64
+    assert np.all(loaded.DM.matrix == sgy.DM.matrix)
+
+
+def test_memory_mapped_segy_is_saved_into_its_own_file(temporary_segy, tmp_path):
+    """ Test that a memory mapped Segy can be saved into the file it was loaded from. """
+
+    path = tmp_path / 'mapped.sgy'
+    path.write_bytes(temporary_segy.read_bytes())
+
+    sgy = Segy(path, mmap=True)
+    sgy.save_file(path)
+
+    loaded = Segy(path)
+
+    assert path.stat().st_size == temporary_segy.stat().st_size
+    assert np.all(loaded.DM.matrix == 12)
+    assert np.all(sgy.DM.matrix == 12)
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_samples_that_do_not_fit_are_not_written(temporary_segy, tmp_path):
+    """ Test that samples out of the range of an integer format are rejected, and the target file is kept. """
+
+    path = tmp_path / 'existing.sgy'
+    path.write_bytes(temporary_segy.read_bytes())
+
+    sgy = Segy.empty(shape=(4, 16))
+    sgy.BFH['Sample Format'] = 3
+
+    for value in (40000.7, np.nan):
+        sgy.DM.matrix[:] = value
+
+        with pytest.raises(ValueError):
+            sgy.save_file(path)
+
+        assert path.read_bytes() == temporary_segy.read_bytes()
+        assert list(tmp_path.iterdir()) == [path]
+
+
+def test_lazy_segy_is_saved(ramp_segy, tmp_path):
+    """ Test that a lazy Segy is saved with workers, and into its own file. """
+
+    Segy(ramp_segy).save_file(tmp_path / 'loaded.sgy')
+
+    Segy(ramp_segy, lazy=True).save_file(tmp_path / 'parallel.sgy', workers=8)
+    assert (tmp_path / 'parallel.sgy').read_bytes() == (tmp_path / 'loaded.sgy').read_bytes()
+
+    path = tmp_path / 'own.sgy'
+    path.write_bytes(ramp_segy.read_bytes())
+
+    Segy(path, lazy=True).save_file(path)
+    assert path.read_bytes() == (tmp_path / 'loaded.sgy').read_bytes()
@@ -0,0 +1,40 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains tests for processing SEG-Y files in chunks with the Segy object.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import numpy as np
+import pandas as pd
+
+from philoseismos import Segy
+
+
+def test_iter_chunks_covers_the_whole_file(temporary_segy):
+    """ Test that the chunks together give the same traces as loading the whole file. """
+
+    sgy = Segy(temporary_segy)
+    chunks = list(sgy.iter_chunks(n_traces=20))
+
+    assert [samples.shape[0] for _, samples in chunks] == [20, 20, 8]
+    assert chunks[2][0].index[0] == 40
+
+    headers = pd.concat([headers for headers, _ in chunks])
+    samples = np.concatenate([samples for _, samples in chunks])
+
+    assert np.all(samples == sgy.DM.matrix)
+    assert headers.reset_index(drop=True).equals(sgy.G.table)
+
+
+def test_write_chunks_round_trip(temporary_segy, tmp_path):
+    """ Test that chunks written into a new file are loaded back correctly. """
+
+    sgy = Segy(temporary_segy, lazy=True)
+    sgy.write_chunks(tmp_path / 'doubled.sgy', ((h, s * 2) for h, s in sgy.iter_chunks(n_traces=7)))
+
+    doubled = Segy(tmp_path / 'doubled.sgy')
+
+    assert doubled.DM.matrix.shape == (48, 512)
+    assert np.all(doubled.DM.matrix == 24)
+    assert doubled.G.table.equals(sgy.G.table)
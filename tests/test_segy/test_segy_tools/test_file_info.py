@@ -0,0 +1,49 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains tests for the SegyFileInfo object.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import shutil
+
+import pytest
+
+from philoseismos import Segy
+from philoseismos.segy import gfunc, SegyFileInfo
+
+
+def test_file_info_values(temporary_segy):
+    """ Test that the parameters of the file are parsed correctly. """
+
+    info = SegyFileInfo.from_file(temporary_segy)
+
+    assert info.endian == '>'
+    assert info.sample_interval == 1000
+    assert info.trace_length == 512
+    assert info.number_of_traces == 48
+    assert info.trace_size == 240 + 512 * info.sample_size
+    assert info.bfh_bytes == Segy(temporary_segy).BFH._bytes
+
+    with pytest.raises(AttributeError):
+        info.trace_length = 10
+
+
+def test_file_info_is_cached_and_invalidated(temporary_segy, tmp_path):
+    """ Test that the parameters are reused, and parsed again after the headers change. """
+
+    path = tmp_path / 'copy.sgy'
+    shutil.copy(temporary_segy, path)
+
+    info = SegyFileInfo.from_file(path)
+    assert SegyFileInfo.from_file(str(path)) is info
+
+    gfunc.set_sample_interval(path, 250)
+    assert gfunc.get_sample_interval(path) == 250
+    assert SegyFileInfo.from_file(path) is not info
+
+    # a file written again is parsed again
+    sgy = Segy.empty(shape=(10, 100), sample_interval=500)
+    sgy.save_file(path)
+    assert gfunc.get_number_of_traces(path) == 10
+    assert gfunc.get_trace_length(path) == 100
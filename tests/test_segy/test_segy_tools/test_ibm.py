@@ -0,0 +1,69 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains tests for packing and unpacking IBM floating point values.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import numpy as np
+
+from philoseismos import Segy
+from philoseismos.segy.tools import ibm
+
+
+values = [0, 1, -1, 0.5, 15.999, 16, -118.625, 3.1415926, 1e-70, -3.3e70, 12]
+
+
+def test_array_functions_match_scalar_functions():
+    """ Test that whole-buffer conversion gives the same bytes and values as per-value conversion. """
+
+    for endian in '<>':
+        packed = bytes(ibm.pack_ibm32_series(endian, values))
+        assert ibm.pack_ibm32_array(endian, values).tobytes() == packed
+
+        unpacked = ibm.unpack_ibm32_series(endian, bytearray(packed))
+        assert np.all(ibm.unpack_ibm32_array(endian, packed, dtype=np.float64) == unpacked)
+
+
+def test_array_functions_keep_the_shape():
+    """ Test that arrays of IBM words keep their shape when unpacked. """
+
+    matrix = np.arange(12, dtype=np.float32).reshape(3, 4) - 6
+    words = ibm.pack_ibm32_array('>', matrix)
+
+    assert words.shape == (3, 4)
+    assert np.all(ibm.unpack_ibm32_array('>', words) == matrix)
+
+
+def test_ibm_segy_round_trip(tmp_path):
+    """ Test saving and loading of a SEG-Y file with IBM values. """
+
+    sgy = Segy.empty(shape=(12, 64), sample_interval=1000)
+    sgy.BFH['Sample Format'] = 1
+    sgy.DM.matrix[:] = np.arange(-384, 384).reshape(12, 64) / 4
+    sgy.save_file(tmp_path / 'ibm.sgy')
+
+    loaded = Segy(tmp_path / 'ibm.sgy')
+
+    assert np.all(loaded.DM.matrix == sgy.DM.matrix)
+
+
+def test_ibm_values_are_loaded_as_float32(tmp_path):
+    """ Test that IBM values are loaded as float32 by default, and as the requested dtype otherwise. """
+
+    sgy = Segy.empty(shape=(4, 16), sample_interval=1000)
+    sgy.BFH['Sample Format'] = 1
+    sgy.DM.matrix[:] = np.arange(64).reshape(4, 16) - 20.5
+    sgy.save_file(tmp_path / 'ibm.sgy')
+
+    assert Segy(tmp_path / 'ibm.sgy').DM.matrix.dtype == np.float32
+
+    loaded = Segy(tmp_path / 'ibm.sgy', dtype=np.float64)
+    assert loaded.DM.matrix.dtype == np.float64
+    assert np.all(loaded.DM.matrix == sgy.DM.matrix)
+    assert Segy(tmp_path / 'ibm.sgy', lazy=True, dtype=np.float64).DM.matrix.dtype == np.float64
+
+    # any float matrix is packed back into IBM values
+    loaded.DM.matrix += 1
+    loaded.DM.replace_in_file(tmp_path / 'ibm.sgy')
+    assert np.all(Segy(tmp_path / 'ibm.sgy').DM.matrix == sgy.DM.matrix + 1)
@@ -0,0 +1,36 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains tests for the instrumentation of the pipeline.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import json
+
+from philoseismos import Segy
+from philoseismos.segy import instrumentation
+
+
+def test_recorder_collects_stages(temporary_segy, tmp_path):
+    """ Test that loading and saving report their stages while a recorder is active. """
+
+    with instrumentation.Recorder(trace_memory=True) as recorder:
+        sgy = Segy(temporary_segy)
+        sgy.save_file(tmp_path / 'saved.sgy')
+
+    stages = set(recorder.to_dataframe().stage)
+    assert {'header parse', 'read', 'sample decode', 'geometry decode', 'scalar application', 'pack',
+            'write'} <= stages
+
+    summary = recorder.summary()
+    assert summary.loc['sample decode', 'traces'] == 48
+    assert summary.loc['write', 'bytes'] == 48 * (240 + 512 * 4)
+    assert summary.peak_memory.notna().all()
+
+    assert len(json.loads(recorder.to_json(tmp_path / 'records.json'))) == len(recorder)
+
+    # nothing is recorded after the recorder is stopped
+    n_records = len(recorder)
+    Segy(temporary_segy)
+    assert len(recorder) == n_records
+    assert not instrumentation._hooks
@@ -0,0 +1,49 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains tests for re-sorting of SEG-Y files.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import numpy as np
+import pytest
+
+from philoseismos import Segy
+from philoseismos.segy import resort
+
+
+@pytest.mark.parametrize('method', ['gather', 'merge'])
+def test_resort(ramp_segy, tmp_path, method):
+    """ Test that the traces are sorted by the keys, with a stable order of equal keys. """
+
+    path = tmp_path / 'sorted.sgy'
+
+    # small buffers and fan in make several batches and merge passes
+    resort(ramp_segy, path, keys=['CDP', 'FFID'], method=method, buffer_size=4 * (240 + 400), fan_in=2)
+
+    original = Segy(ramp_segy)
+    order = np.lexsort([original.G.table.FFID.values, original.G.table.CDP.values])
+
+    resorted = Segy(path)
+    assert np.all(resorted.DM.matrix == original.DM.matrix[order])
+    assert np.all(resorted.G.table.values == original.G.table.values[order])
+    assert resorted.TFH.text == original.TFH.text
+    assert np.all(np.diff(resorted.G.table.CDP.values) >= 0)
+
+
+def test_resort_unknown_method(ramp_segy, tmp_path):
+    """ Test that an unknown method is rejected. """
+
+    with pytest.raises(ValueError):
+        resort(ramp_segy, tmp_path / 'sorted.sgy', method='bubble')
+
+
+def test_resort_into_the_input_file(ramp_segy):
+    """ Test that re-sorting a file into itself is rejected before the file is changed. """
+
+    original = ramp_segy.read_bytes()
+
+    with pytest.raises(ValueError):
+        resort(ramp_segy, ramp_segy)
+
+    assert ramp_segy.read_bytes() == original
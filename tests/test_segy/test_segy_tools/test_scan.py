@@ -0,0 +1,30 @@
+""" philoseismos: with passion for the seismic method.
+
+This file contains tests for concurrent scanning of the headers.
+
+@author: Ivan Dubrovin
+e-mail: dubrovin.io@icloud.com """
+
+import asyncio
+
+import numpy as np
+
+from philoseismos import Segy
+from philoseismos.segy import scan_headers
+
+
+def test_scan_headers(temporary_segy, ramp_segy):
+    """ Test that the headers of every file are returned in the order of the paths. """
+
+    paths = [ramp_segy, temporary_segy, ramp_segy]
+    results = asyncio.run(scan_headers(paths, concurrency=2, columns=['FFID', 'SOU_X']))
+
+    assert len(results) == 3
+
+    for path, (bfh, headers) in zip(paths, results):
+        sgy = Segy(path)
+        assert bfh['# Traces'] == sgy.BFH['# Traces']
+        assert bfh['Sample Interval'] == sgy.BFH['Sample Interval']
+        assert set(headers) == {'FFID', 'SOU_X'}
+        assert np.all(headers['FFID'] == sgy.G.table.FFID.values)
+        assert np.all(headers['SOU_X'] == sgy.G.table.SOU_X.values)